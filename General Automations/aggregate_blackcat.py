@@ -1,108 +1,324 @@
 import pandas as pd
 import os
+import pickle
 import tqdm
+from functools import partial
+from multiprocessing.pool import Pool
+from typing import Iterator, TextIO
 
-ROWS_SKIPPED_BEFORE_READING_TXT_FILE = 15
-ROWS_SKIPPED_SPECIAL_FILE = 14
 MAX_METADATA_ROW_NUM = 13
 BLACKCAT_DIRECTORY_NAME = './Associated Files/Blackcat 2025/'
+BLACKCAT_CACHE_FILE = './Associated Files/Blackcat Study Cache.pkl'
+LANE_COLUMN_NAME = 'Lane'
+NEW_LANE_COLUMN_NAME = ' Channel'
+TIME_COLUMN_NAME = 'Time'
 
-def scrape_study(study_path)->pd.DataFrame:
+def read_study_header(study_file:TextIO,study_path:str)->tuple[list[str],list[str],dict[str,str],bool]:
     """
-    Given the path to the study, scrape relevant information
+    Read the metadata at the top of an open study file, and leave the file positioned at the header of the data table
     
     ### Parameters
-    1. study_path : ``str``
-        - Path to an individual file
+    1. study_file : ``TextIO``
+        - Study file opened at its first line
+    2. study_path : ``str``
+        - Path to the file, for error messages
     
     ### Returns
-    A ``pd.DataFrame`` object containing information for specifically a single blackcat study.
+    ``(<Metadata keys>, <Metadata values>, <Lane as found in the data mapped to its direction>, <Whether the file is in the new format>)``
     """
-    
     keys_list = []
     values_list = []
     directions_set = {'EB','SB','WB','NB'}
     lane_direction_mapping = dict()
     
-    # Have to check for 'new' because of ONE FILE that has a different heading arrangement
-    if 'New' in study_path or 'NEW' in study_path:
-        df = pd.read_csv(study_path,skiprows=ROWS_SKIPPED_BEFORE_READING_TXT_FILE)
-        date_col_name = 'Date'
-        lane_column_name = ' Channel'
-        df[date_col_name] = df.index
+    study_file.readline() # Skip first line, do not need to read the file name
+    for i in range(MAX_METADATA_ROW_NUM):
+        metadata = study_file.readline().rstrip()
+        information_split =  metadata.split(': ')
+        assert information_split.__len__() == 2, f"Metadata not in the format <Key>:<Value> for {study_path}"
+        key = information_split[0]
+        value = information_split[1]
+        
+        if key in directions_set:
+            # In this case, the value will be the lane number that is referenced in the data columns
+            # As such, store the value as the key, and the key (direction) as the mapping
+            # So that we can revert later
+            lane_direction_mapping[value] = key
+        else:
+            keys_list.append(key)
+            values_list.append(value)
+    
+    # The old format has its space separated header right below the metadata, the new format has one more line
+    # before a comma separated header (only ONE FILE has the new heading arrangement)
+    header_position = study_file.tell()
+    header = study_file.readline().rstrip('\n')
+    new_format = LANE_COLUMN_NAME not in header.split(' ')
+    if new_format:
+        header_position = study_file.tell()
+        header = study_file.readline().rstrip('\n')
+        assert NEW_LANE_COLUMN_NAME in header.split(','), f'Col "{LANE_COLUMN_NAME}" or "{NEW_LANE_COLUMN_NAME}" not found in file {study_path}.'
+        # Lanes are written as ' Lane <Lane>' in the data
+        lane_direction_mapping = {f' Lane {value}': key for value, key in lane_direction_mapping.items()}
+    study_file.seek(header_position)
+    
+    return keys_list, values_list, lane_direction_mapping, new_format
+
+def read_data_columns(study_file:TextIO,new_format:bool,columns:list[str],dtype,chunksize:int=None)->Iterator[pd.DataFrame]:
+    """
+    Read only the given columns of the data table, ``chunksize`` rows at a time or all at once when ``None``.
+    The leading date of the new format is named 'Date'.
+    """
+    if new_format:
+        # The header has no name for the leading date, so name every column explicitly
+        header = study_file.readline().rstrip('\n').split(',')
+        tables = pd.read_csv(study_file,header=None,names=['Date'] + header,usecols=columns,dtype=dtype,chunksize=chunksize)
     else:
-        df = pd.read_csv(study_path,skiprows=ROWS_SKIPPED_SPECIAL_FILE,sep=' ')
-        date_col_name = 'Date'
-        lane_column_name = 'Lane'
+        tables = pd.read_csv(study_file,sep=' ',usecols=columns,dtype=dtype,chunksize=chunksize)
     
-    direction_col_name = 'Direction'
+    return iter([tables]) if chunksize is None else tables
+
+def count_by_date_and_lane(study_file:TextIO,new_format:bool,chunksize:int)->pd.DataFrame:
+    """
+    Count the vehicles of each lane on each date, reading the data table ``chunksize`` rows at a time and only its date
+    and lane columns, so that memory does not grow with the length of the file
     
+    ### Parameters
+    1. study_file : ``TextIO``
+        - Study file positioned at the header of the data table
+    2. new_format : ``bool``
+        - Whether the file is in the new format
+    3. chunksize : ``int``
+        - Number of rows read at a time
+    
+    ### Returns
+    A ``pd.DataFrame`` with 'Date', the lane column and 'Count' columns
+    """
+    date_col_name = 'Date'
+    lane_column_name = NEW_LANE_COLUMN_NAME if new_format else LANE_COLUMN_NAME
+    chunks = read_data_columns(study_file,new_format,[date_col_name,lane_column_name],'category',chunksize)
+    
+    counts : dict[tuple[str,str],int] = {}
+    for chunk in chunks:
+        # Only the handful of (date, lane) pairs of each chunk are kept
+        for key, count in chunk.groupby([date_col_name,lane_column_name],observed=True).size().items():
+            counts[key] = counts.get(key,0) + count
+    
+    return pd.DataFrame([(date, lane, count) for (date, lane), count in counts.items()],columns=[date_col_name,lane_column_name,'Count'])
 
+def count_by_bin_and_lane(study_file:TextIO,new_format:bool,bin_sizes:list[str],chunksize:int=None)->dict[str,pd.DataFrame]:
+    """
+    Count the vehicles of each lane in every time bin, for each of the bin sizes. The timestamps are parsed once per
+    row and then floored to every bin size, so all of the bin sizes come out of a single read of the file.
     
-    with open(study_path,mode='rt') as f:
-        next(f) # Skip first line, do not need to read the file name
-        for i in range(MAX_METADATA_ROW_NUM):
-            metadata = f.readline().rstrip()
-            information_split =  metadata.split(': ')
-            assert information_split.__len__() == 2, f"Metadata not in the format <Key>:<Value> for {study_path}"
-            key = information_split[0]
-            value = information_split[1]
-            
-            if key in directions_set:
-                # In this case, the value will be the lane number that is referenced in the data columns
-                # As such, store the value as the key, and the key (direction) as the mapping
-                # So that we can revert later
-                
-                # SAME THING, checking for new smh
-                if 'New' in study_path or 'NEW' in study_path:
-                    lane_direction_mapping[f' Lane {value}'] = key
-                else:
-                    lane_direction_mapping[value] = key
-            else:
-                keys_list.append(key)
-                values_list.append(value)
-    
-    # Map directions
-    assert lane_column_name in df.columns, f'Col "{lane_column_name}" not found in file.'
-    df[direction_col_name] = df[lane_column_name].map(lane_direction_mapping)
-    
-    # Group data based on Date and Direction
-    try:
-        aggregate_count_df = df.groupby([date_col_name,direction_col_name],as_index=False)[[lane_column_name]].count()
-        aggregate_count_df = aggregate_count_df.rename({lane_column_name:'Traffic Count'},axis=1)
-    except KeyError as e:
-        print(f'File {study_path} caused an error')
-        raise e
+    ### Parameters
+    1. study_file : ``TextIO``
+        - Study file positioned at the header of the data table
+    2. new_format : ``bool``
+        - Whether the file is in the new format
+    3. bin_sizes : ``list[str]``
+        - Pandas frequencies, e.g. '1h' or '15min'
+    4. chunksize : ``int``
+        - Number of rows read at a time, the whole table when ``None``
     
+    ### Returns
+    For each bin size, a ``pd.DataFrame`` with 'Bin Start', the lane column and 'Count' columns
+    """
+    date_col_name = 'Date'
+    lane_column_name = NEW_LANE_COLUMN_NAME if new_format else LANE_COLUMN_NAME
+    chunks = read_data_columns(study_file,new_format,[date_col_name,TIME_COLUMN_NAME,lane_column_name],str,chunksize)
+    
+    counts : dict[str,dict[tuple,int]] = {bin_size: {} for bin_size in bin_sizes}
+    for chunk in chunks:
+        timestamps = pd.to_datetime(chunk[date_col_name].str.strip() + ' ' + chunk[TIME_COLUMN_NAME].str.strip())
+        for bin_size in bin_sizes:
+            bin_counts = chunk.groupby([timestamps.dt.floor(bin_size).rename('Bin Start'),lane_column_name]).size()
+            for key, count in bin_counts.items():
+                counts[bin_size][key] = counts[bin_size].get(key,0) + count
+    
+    return {
+        bin_size: pd.DataFrame([(start, lane, count) for (start, lane), count in bin_counts.items()],columns=['Bin Start',lane_column_name,'Count'])
+        for bin_size, bin_counts in counts.items()
+    }
+
+def add_metadata(aggregate_count_df:pd.DataFrame,keys_list:list[str],values_list:list[str])->pd.DataFrame:
     for i,key in enumerate(keys_list):
         aggregate_count_df[key] = pd.Series([values_list[i]] * aggregate_count_df.shape[0])
-
     return aggregate_count_df
 
-def aggregate_blackcat(folder_path:str)->pd.DataFrame:
+def scrape_study(study_path,chunksize:int=None,bin_sizes:list[str]=None)->pd.DataFrame|dict[str,pd.DataFrame]:
+    """
+    Given the path to the study, scrape relevant information. The metadata and the data are read in a single pass
+    over the file.
+    
+    ### Parameters
+    1. study_path : ``str``
+        - Path to an individual file
+    2. chunksize : ``int``
+        - Stream the data in chunks of this many rows instead of loading it whole, for large per-vehicle files
+    3. bin_sizes : ``list[str]``
+        - Count the traffic in bins of these sizes (pandas frequencies, e.g. '1h' or '15min') instead of per date
+    
+    ### Returns
+    A ``pd.DataFrame`` object containing information for specifically a single blackcat study. With ``bin_sizes``,
+    one ``pd.DataFrame`` per bin size with the traffic count per bin, direction and lane.
+    """
+    date_col_name = 'Date'
+    direction_col_name = 'Direction'
+    
+    with open(study_path,mode='rt') as f:
+        keys_list, values_list, lane_direction_mapping, new_format = read_study_header(f,study_path)
+        lane_column_name = NEW_LANE_COLUMN_NAME if new_format else LANE_COLUMN_NAME
+        
+        if chunksize or bin_sizes:
+            try:
+                if bin_sizes:
+                    bin_counts = count_by_bin_and_lane(f,new_format,bin_sizes,chunksize)
+                else:
+                    lane_counts = count_by_date_and_lane(f,new_format,chunksize)
+            except ValueError as e:
+                # usecols raises when the columns are missing
+                raise AssertionError(f'Col "{lane_column_name}" not found in file.') from e
+        elif new_format:
+            # The header has no name for the date, so the date ends up as the index
+            df = pd.read_csv(f)
+            df[date_col_name] = df.index
+        else:
+            df = pd.read_csv(f,sep=' ')
+    
+    if bin_sizes:
+        studies = {}
+        for bin_size, lane_counts in bin_counts.items():
+            # Lanes that are not mapped to a direction are left out, as in the daily counts
+            lane_counts[direction_col_name] = lane_counts[lane_column_name].map(lane_direction_mapping)
+            lane_counts = lane_counts.dropna(subset=[direction_col_name]).rename({lane_column_name:'Lane','Count':'Traffic Count'},axis=1)
+            lane_counts = lane_counts.sort_values(['Bin Start',direction_col_name,'Lane'],ignore_index=True)
+            studies[bin_size] = add_metadata(lane_counts[['Bin Start',direction_col_name,'Lane','Traffic Count']],keys_list,values_list)
+        return studies
+    
+    if chunksize:
+        # Map directions, then add up the lanes going in the same direction
+        lane_counts[direction_col_name] = lane_counts[lane_column_name].map(lane_direction_mapping)
+        aggregate_count_df = lane_counts.groupby([date_col_name,direction_col_name],as_index=False)[['Count']].sum()
+        aggregate_count_df = aggregate_count_df.rename({'Count':'Traffic Count'},axis=1)
+    else:
+        # Map directions
+        assert lane_column_name in df.columns, f'Col "{lane_column_name}" not found in file.'
+        df[direction_col_name] = df[lane_column_name].map(lane_direction_mapping)
+        
+        # Group data based on Date and Direction
+        try:
+            aggregate_count_df = df.groupby([date_col_name,direction_col_name],as_index=False)[[lane_column_name]].count()
+            aggregate_count_df = aggregate_count_df.rename({lane_column_name:'Traffic Count'},axis=1)
+        except KeyError as e:
+            print(f'File {study_path} caused an error')
+            raise e
+    
+    return add_metadata(aggregate_count_df,keys_list,values_list)
+
+class StudyResultCache:
+    """
+    On-disk cache of the result of ``scrape_study`` for each file, keyed by path and by the options the file was
+    scraped with. An entry is only used while the size and modification time of its file are unchanged.
+    
+    Without a ``cache_file``, the cache only lives in memory.
+    """
+    def __init__(self,cache_file:str=None) -> None:
+        self.cache_file = cache_file
+        self.entries : dict[tuple,tuple[list[int],pd.DataFrame|dict[str,pd.DataFrame]]] = {}
+        
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file,mode='rb') as f:
+                self.entries = pickle.load(f)
+    
+    @staticmethod
+    def fingerprint(study_path:str)->list[int]:
+        stat = os.stat(study_path)
+        return [stat.st_size,stat.st_mtime_ns]
+    
+    @staticmethod
+    def key(study_path:str,bin_sizes:list[str]=None)->tuple:
+        return (study_path,tuple(bin_sizes) if bin_sizes else None)
+    
+    def get(self,study_path:str,bin_sizes:list[str]=None):
+        """
+        Return the cached result of the file, or ``None`` if it was never scraped or changed since
+        """
+        entry = self.entries.get(self.key(study_path,bin_sizes))
+        if entry is None or entry[0] != self.fingerprint(study_path):
+            return None
+        return entry[1]
+    
+    def put(self,study_path:str,result,bin_sizes:list[str]=None)->None:
+        self.entries[self.key(study_path,bin_sizes)] = (self.fingerprint(study_path),result)
+    
+    def prune(self,file_names:list[str])->None:
+        """
+        Drop the entries of files that are not in ``file_names`` anymore
+        """
+        keep = set(file_names)
+        self.entries = {key: entry for key, entry in self.entries.items() if key[0] in keep}
+    
+    def save(self)->None:
+        if self.cache_file:
+            with open(self.cache_file,mode='wb') as f:
+                pickle.dump(self.entries,f,protocol=pickle.HIGHEST_PROTOCOL)
+
+def aggregate_blackcat(folder_path:str,workers:int=os.cpu_count(),chunksize:int=None,bin_sizes:list[str]=None,cache_file:str=None)->pd.DataFrame|dict[str,pd.DataFrame]:
     """
     Given the folder path, return a dataframe containing pertinent information
     
     ### Parameters
     1. folder_path : ``str``
         - Path of directory containing blackcat data.
+    2. workers : ``int``
+        - Number of processes the studies are parsed in
+    3. chunksize : ``int``
+        - Stream each file in chunks of this many rows, see ``scrape_study``
+    4. bin_sizes : ``list[str]``
+        - Count the traffic in bins of these sizes instead of per date, see ``scrape_study``
+    5. cache_file : ``str``
+        - Pickle of the result of every study, only files that are new or changed since the last run are parsed
     
     ### Returns
-    A ``pd.DataFrame`` object containing rows representing traffic count per direction per study.
+    A ``pd.DataFrame`` object containing rows representing traffic count per direction per study. With ``bin_sizes``,
+    one ``pd.DataFrame`` per bin size containing rows representing traffic count per bin, direction and lane per study.
     """
     file_names : list[str] = []
-    study_dataframes_list = []
     
     for dirpath, dirnames,filnames in os.walk(folder_path):
         file_names.extend([f'{dirpath}{name}' for name in filnames])
     
-    for study_path in tqdm.tqdm(file_names):
-        study_dataframes_list.append(scrape_study(study_path=study_path))
-        
+    cache = StudyResultCache(cache_file)
+    cache.prune(file_names)
+    results = {study_path: cache.get(study_path,bin_sizes) for study_path in file_names}
+    stale_files = [study_path for study_path, result in results.items() if result is None]
+    if cache_file:
+        print(f'{len(file_names) - len(stale_files)} studies cached, {len(stale_files)} to parse')
+    
+    scrape = partial(scrape_study,chunksize=chunksize,bin_sizes=bin_sizes)
+    if workers and workers > 1 and len(stale_files) > 1:
+        with Pool(workers) as pool:
+            # imap keeps the studies in the same order as the files
+            studies = pool.imap(scrape,stale_files,chunksize=max(1,len(stale_files) // (workers * 4)))
+            parsed = list(tqdm.tqdm(studies,total=len(stale_files)))
+    else:
+        parsed = [scrape(study_path) for study_path in tqdm.tqdm(stale_files)]
+    
+    for study_path, result in zip(stale_files,parsed):
+        results[study_path] = result
+        cache.put(study_path,result,bin_sizes)
+    cache.save()
     
+    study_dataframes_list = [results[study_path] for study_path in file_names]
+    if bin_sizes:
+        return {bin_size: pd.concat([study[bin_size] for study in study_dataframes_list],ignore_index=True) for bin_size in bin_sizes}
     return pd.concat(study_dataframes_list,ignore_index=True)
     
 
 if __name__ == "__main__":
-    df = aggregate_blackcat(folder_path=BLACKCAT_DIRECTORY_NAME)
-    df.to_excel('./Associated Files/Blackcat Aggregate Counts.xlsx',index=False)
\ No newline at end of file
+    df = aggregate_blackcat(folder_path=BLACKCAT_DIRECTORY_NAME,cache_file=BLACKCAT_CACHE_FILE)
+    df.to_excel('./Associated Files/Blackcat Aggregate Counts.xlsx',index=False)
+    # profiles = aggregate_blackcat(folder_path=BLACKCAT_DIRECTORY_NAME,bin_sizes=['1h','15min'],cache_file=BLACKCAT_CACHE_FILE)
+    # with pd.ExcelWriter('./Associated Files/Blackcat Binned Counts.xlsx') as writer:
+    #     for bin_size, profile in profiles.items():
+    #         profile.to_excel(writer,sheet_name=bin_size,index=False)
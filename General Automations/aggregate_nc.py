@@ -1,20 +1,112 @@
+import argparse
 import pandas as pd
+import numpy as np
 import os
 import tqdm
+from openpyxl import load_workbook
+from collections import defaultdict
+from dataclasses import dataclass
+from multiprocessing.pool import Pool
 
 STORAGE_DIRECTORY = './Associated Files/NC 2025/'
 LOCATION_FILE_NAME = 'NC - Location Coordinates'
 ROWS_SKIPPED_BEFORE_COLUMNS = 10
+LOCATION_NAME_COL = 'LocationName'
+LATITUDE_COL = 'NC_Latitude'
+LONGITUDE_COL = 'NC_Longitude'
+# Column of each label in the header block of a study, and of the value to its right
+STREET_LABEL = 'Street:'
+SPEED_LIMIT_LABEL = 'Speed Limit:'
+METADATA_LABEL_COLUMNS = {STREET_LABEL: (1, 4), SPEED_LIMIT_LABEL: (7, 8)}
 
-def return_lat_long(study_name:str,location_df:pd.DataFrame)->tuple[float,float]:
+def tokenize_location_name(name:str)->set[str]:
     """
-    Given the study name and location names df, match the study name to closest location name based on jaccard similarity and return
-    the lat and long stored in the location_df object. 
+    Lowercase words of a study or location name, so that names are compared regardless of case and spacing
+    """
+    return set(name.lower().split()) if isinstance(name, str) else set()
+
+@dataclass
+class LocationIndex:
+    """
+    Geocode table prepared once for matching study names: the words of each location name, an inverted index from
+    each word to the locations containing it, and the coordinates in the same order as the names
+    """
+    names : list[str]
+    token_sets : list[set[str]]
+    token_counts : np.ndarray
+    token_locations : dict[str, np.ndarray]
+    latitudes : np.ndarray
+    longitudes : np.ndarray
+
+    @classmethod
+    def from_frame(cls, location_df:pd.DataFrame) -> 'LocationIndex':
+        names : list[str] = location_df[LOCATION_NAME_COL].tolist()
+        token_sets = [tokenize_location_name(location_name) for location_name in names]
+
+        token_locations : dict[str, list[int]] = defaultdict(list)
+        for i, token_set in enumerate(token_sets):
+            for token in token_set:
+                token_locations[token].append(i)
+
+        return cls(
+            names=names,
+            token_sets=token_sets,
+            token_counts=np.array([len(token_set) for token_set in token_sets], dtype=np.int64),
+            token_locations={token: np.array(locations, dtype=np.int64) for token, locations in token_locations.items()},
+            latitudes=location_df[LATITUDE_COL].to_numpy(),
+            longitudes=location_df[LONGITUDE_COL].to_numpy()
+        )
+
+    @classmethod
+    def from_file(cls, geocode_file_path:str) -> 'LocationIndex':
+        return cls.from_frame(pd.read_excel(geocode_file_path))
+
+    def match(self, study_name:str) -> tuple[int, float]:
+        """
+        Find the location whose name is the most similar to the study name, by the jaccard similarity of their words.
+        Only locations sharing at least one word with the study are scored, the others have a similarity of 0.
+
+        ### Returns
+        ``(<Position of the location>, <Jaccard similarity>)``. Ties go to the first location, and a study that shares
+        no word with any location matches the first one with a similarity of 0.
+        """
+        study_tokens = tokenize_location_name(study_name)
+        postings = [self.token_locations[token] for token in study_tokens if token in self.token_locations]
+        if not postings:
+            return 0, 0.0
+
+        # Number of words each location shares with the study, the candidates are the locations sharing any
+        shared_counts = np.bincount(np.concatenate(postings), minlength=len(self.names))
+        candidates = np.flatnonzero(shared_counts)
+        shared = shared_counts[candidates]
+
+        # Jaccard similarity: len(intersection of sets) / len(union of sets)
+        scores = shared / (self.token_counts[candidates] + len(study_tokens) - shared)
+        # Candidates are in ascending order, so argmax returns the first of the best locations
+        best = int(np.argmax(scores))
+        return int(candidates[best]), float(scores[best])
+
+    def match_brute_force(self, study_name:str) -> tuple[int, float]:
+        """
+        Same as ``match``, scoring every location. Kept to check ``match`` against.
+        """
+        study_tokens = tokenize_location_name(study_name)
+        scores = [
+            len(location_set & study_tokens) / len(location_set | study_tokens) if location_set | study_tokens else 0.0
+            for location_set in self.token_sets
+        ]
+        best_score = max(scores)
+        return scores.index(best_score), best_score
+
+def return_lat_long(study_name:str,location_index:LocationIndex)->tuple[float,float]:
+    """
+    Given the study name and location index, match the study name to closest location name based on jaccard similarity and return
+    the lat and long stored in the location_index object. 
     
     ### Parameters
     1. study_name : ``str``
         - Name of the study 
-    2. location_df : ``pd.DataFrame``
+    2. location_index : ``LocationIndex``
         - Object containing geocodes for all of the studies
     
     ### Effects
@@ -24,33 +116,54 @@ def return_lat_long(study_name:str,location_df:pd.DataFrame)->tuple[float,float]
     A ``tuple(float,float)`` object returning the (latitude,longitude).
     """
     
-    study_name_set = {word for word in study_name.split(' ')}
+    location, _ = location_index.match(study_name)
+    return location_index.latitudes[location], location_index.longitudes[location]
+    
+
+def read_study_workbook(study_file_path:str)->tuple[dict[str,object],pd.DataFrame]:
+    """
+    Read the rows of an NC study workbook once, and split them into the labels of its header block and its data table.
     
-    location_name_col = 'LocationName'
-    lat_col_name = 'NC_Latitude'
-    long_col_name = 'NC_Longitude'
+    ### Parameters
+    1. study_file_path : ``str``
+        - Path to file containg information on the study
+    
+    ### Effects
+    Nothing outside of this function.
+    
+    ### Returns
+    A ``tuple(dict,pd.DataFrame)`` object returning the value of each label of ``METADATA_LABEL_COLUMNS`` found above the
+    data table, and the data table with the row ``ROWS_SKIPPED_BEFORE_COLUMNS`` as its header.
+    """
     
-    location_names : list[str] = location_df[location_name_col].tolist()
-    location_sets = [{word for word in location_name.lower().split(' ')} for location_name in location_names]
+    workbook = load_workbook(study_file_path, read_only=True, data_only=True)
+    try:
+        rows = [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
     
-    # Jaccard similarity: len(intersection of sets) / len(union of sets)
-    jaccard_scores = [len(location_set.intersection(study_name_set)) / len(location_set.union(study_name_set)) for location_set in location_sets]
-    max_jaccard_score = max(jaccard_scores)
-    max_jaccard_index = jaccard_scores.index(max_jaccard_score)
+    metadata = {}
+    for row in rows[:ROWS_SKIPPED_BEFORE_COLUMNS]:
+        for label, (label_col, value_col) in METADATA_LABEL_COLUMNS.items():
+            if label not in metadata and len(row) > label_col and row[label_col] == label:
+                metadata[label] = row[value_col] if len(row) > value_col else None
     
-    return location_df.loc[max_jaccard_index,lat_col_name], location_df.loc[max_jaccard_index,long_col_name]
+    header = rows[ROWS_SKIPPED_BEFORE_COLUMNS] if len(rows) > ROWS_SKIPPED_BEFORE_COLUMNS else []
+    study_data_df = pd.DataFrame(rows[ROWS_SKIPPED_BEFORE_COLUMNS + 1:], columns=header if header else None)
+    
+    return metadata, study_data_df
     
 
-def scrape_information_per_file(study_file_path:str, geocode_file_path:str)->pd.DataFrame:
+def scrape_information_per_file(study_file_path:str, location_index:LocationIndex)->pd.DataFrame:
     """
-    Given the study_file_path, scrape relevant information and use in tandem with geocode_file_path file to attach lat and long
+    Given the study_file_path, scrape relevant information and use in tandem with location_index to attach lat and long
     and output dataframe containing count information.
     
     ### Parameters
     1. study_file_path : ``str``
         - Path to file containg information on the study
-    2. geocode_file : ``str``
-        - Path to file containing location information.
+    2. location_index : ``LocationIndex``
+        - Geocodes of every location, loaded once per aggregation with ``LocationIndex.from_file``.
         
     ### Effects
     Nothing outside of this function
@@ -59,9 +172,7 @@ def scrape_information_per_file(study_file_path:str, geocode_file_path:str)->pd.
     A ``pd.DataFrame`` containing all counts grouped by day for the study.
     """
     
-    study_df = pd.read_excel(study_file_path)
-    study_data_df = pd.read_excel(study_file_path,skiprows=ROWS_SKIPPED_BEFORE_COLUMNS)
-    locations_df = pd.read_excel(geocode_file_path)
+    metadata, study_data_df = read_study_workbook(study_file_path)
     
     information_dict = {}
     
@@ -83,31 +194,25 @@ def scrape_information_per_file(study_file_path:str, geocode_file_path:str)->pd.
     information_dict[count_col_name] = aggregated_counts_series.values
     
     # Get study Name
-    study_name_col = study_df.columns[4]
-    study_label_col = study_df.columns[1]
-    study_label_target = 'Street:'
-    
-    assert study_label_target in study_df[study_label_col].unique(), 'Label "Street:" not found in target column.'
-    study_name_row_index = study_df[study_name_col][study_df[study_label_col] == study_label_target].index
-    study_name : str = study_df.loc[study_name_row_index,study_name_col].tolist()[0]
+    assert STREET_LABEL in metadata, 'Label "Street:" not found in target column.'
+    study_name : str = metadata[STREET_LABEL]
     
     # Get the speed limit
-    speed_limit_col = study_df.columns[8]
-    speed_limit_label_col = study_df.columns[7]
-    speed_limit_label_target = 'Speed Limit:'
-    
-    assert speed_limit_label_target in study_df[speed_limit_label_col].unique(), 'Label "Speed Limit:" not found in target column.'
-    speed_limit_row_index = study_df[speed_limit_col][study_df[speed_limit_label_col] == speed_limit_label_target].index
-    speed_limit : str = study_df.loc[speed_limit_row_index,speed_limit_col].tolist()[0]
+    assert SPEED_LIMIT_LABEL in metadata, 'Label "Speed Limit:" not found in target column.'
+    speed_limit : str = metadata[SPEED_LIMIT_LABEL]
+    # pandas read numeric speed limits as floats, as the rest of their column is empty
+    if isinstance(speed_limit, int) and not isinstance(speed_limit, bool):
+        speed_limit = float(speed_limit)
     
     # Get the latitude and longitude
-    latitude, longitude = return_lat_long(study_name=study_name,location_df=locations_df)
+    latitude, longitude = return_lat_long(study_name=study_name,location_index=location_index)
     
-    # Split the file name to remove the extension and then split by white space to get the last word (representing the direction|Lane number)
-    direction_or_lane_number = study_file_path.split('.')[1].split(' ')[-1].upper()
+    # Remove the folders and the extension from the file name and then split by white space to get the last word (representing the direction|Lane number)
+    file_name_words = os.path.splitext(os.path.basename(study_file_path))[0].split(' ')
+    direction_or_lane_number = file_name_words[-1].upper()
     
     if direction_or_lane_number.isnumeric():
-        direction_name = study_file_path.split('.')[1].split(' ')[-2].upper()
+        direction_name = file_name_words[-2].upper()
         lane_number = direction_or_lane_number
     else:
         direction_name = direction_or_lane_number
@@ -123,7 +228,40 @@ def scrape_information_per_file(study_file_path:str, geocode_file_path:str)->pd.
     return pd.DataFrame(information_dict)
     
 
-def aggregate_NC_files(folder_path:str, location_file_name:str)->pd.DataFrame:
+# Geocodes of the worker processes of aggregate_NC_files, sent once to each worker by its initializer
+worker_location_index : LocationIndex = None
+
+def init_nc_worker(location_index:LocationIndex)->None:
+    global worker_location_index
+    worker_location_index = location_index
+
+def scrape_with_worker_index(study_file_path:str)->pd.DataFrame:
+    return scrape_information_per_file(study_file_path=study_file_path,location_index=worker_location_index)
+
+def list_study_files(folder_path:str, location_file_name:str)->tuple[list[str],str]:
+    """
+    Walk the NC directory once, splitting its files into the studies and the geocode file.
+    
+    ### Returns
+    A ``tuple(list[str],str)`` object returning the (study file addresses, geocode file address).
+    """
+    
+    file_addresses : list[str] = []
+    location_file_address = ''
+    
+    for dirpath, dirnames, filenames in os.walk(folder_path):
+        for filename in filenames:
+            if location_file_name in filename:
+                location_file_address = os.path.join(dirpath, filename)
+            else:
+                file_addresses.append(os.path.join(dirpath, filename))
+    
+    if not location_file_address:
+        raise Exception("Geocode file not found in the directory")
+    
+    return file_addresses, location_file_address
+
+def aggregate_NC_files(folder_path:str, location_file_name:str, workers:int=os.cpu_count())->pd.DataFrame:
     """
     Given the file path to the NC directory, read through every file and scrape up relevant details
     
@@ -132,40 +270,41 @@ def aggregate_NC_files(folder_path:str, location_file_name:str)->pd.DataFrame:
         - Path to storage (relative or absolute)
     2. location_file_name : ``str``
         - Name of the file which contains the geocodes for each of the locations in the directory
+    3. workers : ``int``
+        - Number of processes the study files are parsed across, parsed in this process when 1
     
     ### Effects
     Nothing outside of this function.
     
     ### Returns
-    A ``pd.DataFrame`` object containing the aggregated information.
+    A ``pd.DataFrame`` object containing the aggregated information, the studies in the order of the directory walk.
     """
     
-    file_addresses : list[str] = []
-    location_file_address = ''
-    location_file_index = -1
+    file_addresses, location_file_address = list_study_files(folder_path, location_file_name)
+    location_index = LocationIndex.from_file(location_file_address)
     
-    for dirpath, dirnames, filenames in  os.walk(folder_path):
-        file_addresses.extend([dirpath + filename for filename in filenames])
-        
-        # Obtain the address for the geocode file
-        for i,address in enumerate(file_addresses):
-            if location_file_name in address:
-                location_file_address = address
-                location_file_index = i
-        
-    if location_file_index == -1:
-        raise Exception("Geocode file not found in the directory")
+    if workers and workers > 1 and len(file_addresses) > 1:
+        with Pool(workers, initializer=init_nc_worker, initargs=(location_index,)) as pool:
+            # imap keeps the studies in the same order as the files
+            studies = pool.imap(scrape_with_worker_index,file_addresses,chunksize=max(1,len(file_addresses) // (workers * 4)))
+            study_dataframes_list : list[pd.DataFrame] = list(tqdm.tqdm(studies,total=len(file_addresses)))
     else:
-        # Delete the location file from list of files representing studies
-        file_addresses.pop(location_file_index)
-    
-    study_dataframes_list : list[pd.DataFrame] = []
-    
-    for address in tqdm.tqdm(file_addresses):
-        study_dataframes_list.append(scrape_information_per_file(study_file_path=rf'{address}',geocode_file_path=rf'{location_file_address}'))
+        study_dataframes_list = [scrape_information_per_file(study_file_path=address,location_index=location_index) for address in tqdm.tqdm(file_addresses)]
         
     return pd.concat(study_dataframes_list,ignore_index=True)
 
+def configure_parser()->argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="NC Aggregate",
+        description="Aggregates the daily counts of every NC study, with the coordinates of its closest location"
+    )
+    parser.add_argument('--folder-path', default=STORAGE_DIRECTORY)
+    parser.add_argument('--location-file-name', default=LOCATION_FILE_NAME)
+    parser.add_argument('--output-file', default='./Associated Files/NC Aggregate Counts.xlsx')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of processes parsing the study files')
+    return parser
+
 if __name__ == "__main__":
-    df = aggregate_NC_files(folder_path=STORAGE_DIRECTORY,location_file_name=LOCATION_FILE_NAME)
-    df.to_excel('./Associated Files/NC Aggregate Counts.xlsx',index=False)
\ No newline at end of file
+    args = configure_parser().parse_args()
+    df = aggregate_NC_files(folder_path=args.folder_path,location_file_name=args.location_file_name,workers=args.workers)
+    df.to_excel(args.output_file,index=False)
@@ -0,0 +1,35 @@
+import argparse
+import os
+import time
+from aggregate_blackcat import aggregate_blackcat
+from synthetic_blackcat import generate_blackcat_corpus
+
+DEFAULT_CORPUS_FOLDER = './Benchmark Blackcat/'
+
+
+def configure_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="Blackcat Benchmark",
+        description="Times aggregate_blackcat on synthetic Blackcat record files with different numbers of workers"
+    )
+    parser.add_argument('--files', type=int, default=2000, help='Number of record files in the corpus')
+    parser.add_argument('--vehicles-per-day', type=int, default=500)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()], help='Numbers of workers to try')
+    parser.add_argument('--chunksize', type=int, default=None, help='Stream each file in chunks of this many rows')
+    parser.add_argument('--corpus-folder', default=DEFAULT_CORPUS_FOLDER, help='Folder the corpus is generated in (and reused from)')
+    return parser
+
+
+if __name__ == "__main__":
+    args = configure_parser().parse_args()
+    corpus_folder = os.path.join(args.corpus_folder, f'{args.files} files {args.vehicles_per_day} per day {args.days} days', '')
+
+    print(f'Generating {args.files} synthetic record files in {corpus_folder}')
+    generate_blackcat_corpus(corpus_folder, args.files, vehicles_per_day=args.vehicles_per_day, days=args.days)
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        df = aggregate_blackcat(corpus_folder, workers=workers, chunksize=args.chunksize)
+        seconds = time.perf_counter() - start
+        print(f'{workers} workers: {seconds:.2f}s, {args.files / seconds:.1f} files/s, {len(df)} rows')
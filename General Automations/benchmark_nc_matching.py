@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+import pandas as pd
+from aggregate_nc import LocationIndex, LOCATION_NAME_COL, LATITUDE_COL, LONGITUDE_COL
+
+STREET_TYPES = ['St', 'Ave', 'Rd', 'Blvd', 'Dr', 'Trail', 'Way', 'Gate']
+QUADRANTS = ['NW', 'SW', 'NE', 'SE']
+NAMED_STREETS = ['Whyte', 'Jasper', 'Gateway', 'Yellowhead', 'Ellerslie', 'Anthony Henday', 'Terwillegar', 'Fort',
+                 'Stony Plain', 'Calgary', 'Manning', 'Victoria', 'Groat', 'Saskatchewan', 'Rabbit Hill', 'Parsons']
+
+
+def street_name(rng:random.Random) -> str:
+    street = str(rng.randint(1, 250)) if rng.random() < 0.7 else rng.choice(NAMED_STREETS)
+    return f'{street} {rng.choice(STREET_TYPES)} {rng.choice(QUADRANTS)}'
+
+
+def synthetic_locations(count:int, seed:int=0) -> pd.DataFrame:
+    """
+    Location coordinates table with names like '<Street> between <Street> and <Street>'
+    """
+    rng = random.Random(seed)
+    names = [f'{street_name(rng)} between {street_name(rng)} and {street_name(rng)}'.lower() for _ in range(count)]
+    return pd.DataFrame({
+        LOCATION_NAME_COL: names,
+        LATITUDE_COL: [rng.uniform(53.4, 53.7) for _ in names],
+        LONGITUDE_COL: [rng.uniform(-113.7, -113.3) for _ in names]
+    })
+
+
+def synthetic_study_names(location_names:list[str], count:int, seed:int=0) -> list[str]:
+    """
+    Study names written the way they are in the study files, i.e. a location name with its case changed and some of
+    its words dropped, along with names that match no location at all
+    """
+    rng = random.Random(seed)
+    study_names = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            study_names.append('Unknown Location')
+            continue
+        words = rng.choice(location_names).split(' ')
+        words = [word for word in words if rng.random() < 0.85] or words
+        study_names.append(' '.join(word.upper() if rng.random() < 0.5 else word.title() for word in words))
+    return study_names
+
+
+def configure_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="NC Location Matching Benchmark",
+        description="Compares the inverted index location matcher with scoring every location, on synthetic names"
+    )
+    parser.add_argument('--locations', type=int, default=10000, help='Number of locations in the coordinates table')
+    parser.add_argument('--studies', type=int, default=2000, help='Number of study names to match')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+if __name__ == "__main__":
+    args = configure_parser().parse_args()
+    locations_df = synthetic_locations(args.locations, args.seed)
+    study_names = synthetic_study_names(locations_df[LOCATION_NAME_COL].tolist(), args.studies, args.seed + 1)
+
+    start = time.perf_counter()
+    location_index = LocationIndex.from_frame(locations_df)
+    print(f'Index of {args.locations} locations built in {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    brute_force_matches = [location_index.match_brute_force(study_name) for study_name in study_names]
+    brute_force_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = [location_index.match(study_name) for study_name in study_names]
+    index_seconds = time.perf_counter() - start
+
+    mismatches = sum(match != brute_force_match for match, brute_force_match in zip(matches, brute_force_matches))
+    print(f'Brute force: {brute_force_seconds:.2f}s, {args.studies / brute_force_seconds:.0f} studies/s')
+    print(f'Inverted index: {index_seconds:.2f}s, {args.studies / index_seconds:.0f} studies/s')
+    print(f'Speedup: {brute_force_seconds / index_seconds:.1f}x, {mismatches} of {args.studies} matches differ')
@@ -0,0 +1,108 @@
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+DIRECTION_PAIRS = [('EB', 'WB'), ('NB', 'SB')]
+NEW_FORMAT_SECTION_LINE = 'Per Vehicle Records'
+
+@dataclass
+class SyntheticBlackcatConfig:
+    """
+    Layout and volumes of a generated Blackcat per-vehicle record file
+    """
+    site_id : int
+    new_format : bool = False
+    directions : tuple[str, ...] = ('EB', 'WB')
+    start_time : datetime = datetime(2025, 4, 1)
+    days : int = 7
+    vehicles_per_day : int = 2000
+    seed : int = 0
+
+def lane_label(config:SyntheticBlackcatConfig, lane:int) -> str:
+    """
+    Lane as referenced by the metadata, the new layout prefixes it with ' Lane ' in its ' Channel' column
+    """
+    return str(lane) if config.new_format else f'L{lane}'
+
+def metadata_lines(config:SyntheticBlackcatConfig) -> list[str]:
+    """
+    The 13 '<Key>: <Value>' lines below the file name, the direction keys map each direction to its lane
+    """
+    end_time = config.start_time + timedelta(days=config.days)
+    lines = [
+        f'Site: {config.site_id}',
+        f'Location: {config.site_id} Street NW',
+        'Municipality: Edmonton',
+        'Latitude: 53.5461',
+        'Longitude: -113.4938',
+        f'Start Date: {config.start_time:%Y-%m-%d}',
+        f'End Date: {end_time:%Y-%m-%d}',
+        'Speed Limit: 50',
+        'Road Type: Collector',
+        f'Lanes: {len(config.directions)}'
+    ]
+    lines.extend(f'{direction}: {lane_label(config, lane)}' for lane, direction in enumerate(config.directions, start=1))
+    while len(lines) < 13:
+        lines.append(f'Note {len(lines)}: Synthetic')
+    return lines
+
+def write_blackcat_file(file_path:str, config:SyntheticBlackcatConfig) -> None:
+    """
+    Write a per-vehicle record file in either Blackcat layout. The old layout has a space separated table with a
+    'Lane' column right below the metadata. The new layout has one more line before a comma separated table, whose
+    header has no name for the leading date field, and a ' Channel' column of ' Lane <N>' values.
+    """
+    rng = random.Random(config.seed)
+    lines = [os.path.basename(file_path)] + metadata_lines(config)
+
+    if config.new_format:
+        lines.append(NEW_FORMAT_SECTION_LINE)
+        lines.append('Time, Channel, Speed, Length, Class')
+    else:
+        lines.append('Date Time Lane Speed Length Class')
+
+    seconds_per_vehicle = 86400 / config.vehicles_per_day
+    for vehicle in range(config.days * config.vehicles_per_day):
+        timestamp = config.start_time + timedelta(seconds=vehicle * seconds_per_vehicle + rng.random() * seconds_per_vehicle)
+        lane = rng.randint(1, len(config.directions))
+        speed = rng.randint(20, 80)
+        length = round(rng.uniform(3, 20), 1)
+        vehicle_class = rng.randint(1, 13)
+        if config.new_format:
+            lines.append(f'{timestamp:%Y-%m-%d},{timestamp:%H:%M:%S}, Lane {lane}, {speed}, {length}, {vehicle_class}')
+        else:
+            lines.append(f'{timestamp:%Y-%m-%d} {timestamp:%H:%M:%S} {lane_label(config, lane)} {speed} {length} {vehicle_class}')
+
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    with open(file_path, mode='w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+def generate_blackcat_corpus(folder_path:str, file_count:int, seed:int=0, vehicles_per_day:int=2000, days:int=7) -> list[str]:
+    """
+    Generate ``file_count`` record files in ``folder_path``, about one in ten in the new layout. Files that already
+    exist are reused.
+
+    ### Returns
+    The file paths, in the '<folder_path><name>' form ``aggregate_blackcat`` builds
+    """
+    rng = random.Random(seed)
+    file_names = []
+
+    for i in range(file_count):
+        config = SyntheticBlackcatConfig(
+            site_id=1000 + i,
+            new_format=rng.random() < 0.1,
+            directions=rng.choice(DIRECTION_PAIRS),
+            start_time=datetime(2025, rng.randint(1, 12), rng.randint(1, 20)),
+            days=days,
+            vehicles_per_day=vehicles_per_day,
+            seed=rng.randint(0, 2**31)
+        )
+        # New layout files are named like the real ones, though the parser tells the layouts apart by their header
+        file_name = f'{folder_path}Site {config.site_id}{" New" if config.new_format else ""}.txt'
+        if not os.path.exists(file_name):
+            write_blackcat_file(file_name, config)
+        file_names.append(file_name)
+
+    return file_names
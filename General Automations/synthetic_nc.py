@@ -0,0 +1,86 @@
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import pandas as pd
+from openpyxl import Workbook
+from aggregate_nc import LOCATION_NAME_COL, LATITUDE_COL, LONGITUDE_COL, ROWS_SKIPPED_BEFORE_COLUMNS, STREET_LABEL, SPEED_LIMIT_LABEL, METADATA_LABEL_COLUMNS
+
+STREET_WORDS = ['Ave', 'St', 'Street', 'Whyte', 'Jasper', 'Gateway', 'Blvd', 'NW', 'SW', '101', '97', 'Yellowhead', 'Trail', 'Rd', 'Ellerslie']
+FILE_NAME_SUFFIXES = ['NB', 'SB', 'EB', 'WB', 'NB 1', 'SB 2', 'EB 2', 'WB 1']
+SPEED_LIMITS = [50, 60, 70, 'Unknown']
+DATA_COLUMNS = ['Date And Time', 'Count', 'Speed', 'Length']
+
+@dataclass
+class SyntheticNCConfig:
+    """
+    Header block and vehicle records of a generated NC study workbook
+    """
+    street : str
+    speed_limit : object = 50
+    start_time : datetime = datetime(2025, 5, 1)
+    vehicles : int = 500
+    seed : int = 0
+
+def write_nc_study(file_path:str, config:SyntheticNCConfig) -> None:
+    """
+    Write a study with the same layout as an NC export: a header block with 'Street:' and 'Speed Limit:' labels at
+    the columns of ``METADATA_LABEL_COLUMNS``, then one row per vehicle below the header on row
+    ``ROWS_SKIPPED_BEFORE_COLUMNS + 1``.
+    """
+    rng = random.Random(config.seed)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.cell(1, 1, 'NC200 Vehicle Counter Report')
+
+    # openpyxl cells are 1 based, the label columns are 0 based like the ones pandas gives
+    for row, (label, value) in enumerate([(STREET_LABEL, config.street), (SPEED_LIMIT_LABEL, config.speed_limit)], start=3):
+        label_col, value_col = METADATA_LABEL_COLUMNS[label]
+        sheet.cell(row, label_col + 1, label)
+        sheet.cell(row, value_col + 1, value)
+
+    header_row = ROWS_SKIPPED_BEFORE_COLUMNS + 1
+    for col, name in enumerate(DATA_COLUMNS, start=1):
+        sheet.cell(header_row, col, name)
+
+    timestamp = config.start_time
+    for row in range(header_row + 1, header_row + 1 + config.vehicles):
+        timestamp += timedelta(seconds=rng.randint(10, 900))
+        for col, value in enumerate([timestamp, 1, rng.randint(20, 80), round(rng.uniform(3, 20), 1)], start=1):
+            sheet.cell(row, col, value)
+
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    workbook.save(file_path)
+
+def generate_nc_corpus(folder_path:str, file_count:int, location_file_name:str, seed:int=0, location_count:int=200) -> list[str]:
+    """
+    Generate a location coordinates workbook named ``location_file_name`` and ``file_count`` studies in ``folder_path``.
+    Study streets are location names, about half of them with a different case.
+
+    ### Returns
+    The paths of the study files
+    """
+    rng = random.Random(seed)
+    names = [' '.join(rng.sample(STREET_WORDS, rng.randint(2, 5))) for _ in range(location_count)]
+    os.makedirs(folder_path, exist_ok=True)
+    pd.DataFrame({
+        LOCATION_NAME_COL: [name.lower() for name in names],
+        LATITUDE_COL: [rng.uniform(53.4, 53.7) for _ in names],
+        LONGITUDE_COL: [rng.uniform(-113.7, -113.3) for _ in names]
+    }).to_excel(os.path.join(folder_path, f'{location_file_name}.xlsx'), index=False)
+
+    file_names = []
+    for i in range(file_count):
+        street = rng.choice(names)
+        config = SyntheticNCConfig(
+            street=street.lower() if rng.random() < 0.5 else street,
+            speed_limit=rng.choice(SPEED_LIMITS),
+            start_time=datetime(2025, rng.randint(1, 12), rng.randint(1, 20)),
+            vehicles=rng.randint(200, 800),
+            seed=rng.randint(0, 2**31)
+        )
+        file_name = os.path.join(folder_path, f'Study {i} {rng.choice(FILE_NAME_SUFFIXES)}.xlsx')
+        write_nc_study(file_name, config)
+        file_names.append(file_name)
+
+    return file_names
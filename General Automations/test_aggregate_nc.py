@@ -0,0 +1,61 @@
+import os
+import pandas as pd
+import pytest
+from aggregate_nc import aggregate_NC_files, LocationIndex, read_study_workbook, scrape_information_per_file, ROWS_SKIPPED_BEFORE_COLUMNS
+from synthetic_nc import generate_nc_corpus
+
+LOCATION_FILE_NAME = 'NC - Location Coordinates'
+
+def read_study_with_pandas(study_file_path:str)->tuple[dict[str,object],pd.DataFrame]:
+    """
+    The header block and data table as they were read before ``read_study_workbook``, with one ``pd.read_excel`` each
+    """
+    study_df = pd.read_excel(study_file_path)
+    study_data_df = pd.read_excel(study_file_path,skiprows=ROWS_SKIPPED_BEFORE_COLUMNS)
+
+    metadata = {}
+    for label, label_col, value_col in [('Street:', 1, 4), ('Speed Limit:', 7, 8)]:
+        label_values = study_df[study_df.columns[label_col]]
+        metadata[label] = study_df.loc[label_values == label, study_df.columns[value_col]].tolist()[0]
+    return metadata, study_data_df
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    folder_path = str(tmp_path_factory.mktemp('nc'))
+    return folder_path, generate_nc_corpus(folder_path, 12, LOCATION_FILE_NAME, seed=3)
+
+def test_read_study_workbook_matches_pandas(corpus):
+    _, study_files = corpus
+    for study_file in study_files:
+        metadata, study_data_df = read_study_workbook(study_file)
+        expected_metadata, expected_data_df = read_study_with_pandas(study_file)
+
+        assert metadata['Street:'] == expected_metadata['Street:']
+        assert str(metadata['Speed Limit:']) == str(expected_metadata['Speed Limit:']).removesuffix('.0')
+        for col in ['Date And Time', 'Count']:
+            pd.testing.assert_series_equal(
+                pd.Series(study_data_df[col].tolist(), name=col),
+                pd.Series(expected_data_df[col].tolist(), name=col),
+                check_dtype=False
+            )
+
+def test_scrape_keeps_the_speed_limit_pandas_read(corpus):
+    folder_path, study_files = corpus
+    location_index = LocationIndex.from_file(f'{folder_path}/{LOCATION_FILE_NAME}.xlsx')
+    for study_file in study_files:
+        speed_limits = scrape_information_per_file(study_file, location_index)['Speed Limit'].unique().tolist()
+        expected_speed_limit = read_study_with_pandas(study_file)[0]['Speed Limit:']
+        assert speed_limits == [expected_speed_limit]
+        assert type(speed_limits[0]) is type(expected_speed_limit)
+
+@pytest.mark.parametrize('folder_name', ['NC 2025', 'NC v2.0.1'])
+def test_direction_and_lane_from_any_folder(tmp_path, monkeypatch, folder_name):
+    generate_nc_corpus(str(tmp_path / folder_name), 6, LOCATION_FILE_NAME, seed=5)
+
+    # Absolute folder path, then the folder name relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    for folder_path in [str(tmp_path / folder_name), folder_name]:
+        df = aggregate_NC_files(folder_path, LOCATION_FILE_NAME, workers=1)
+        study_file_suffixes = {tuple(name.rsplit('.', 1)[0].split(' ')[2:]) for name in os.listdir(folder_path) if name.startswith('Study')}
+        expected = {(suffix[0], suffix[1] if len(suffix) > 1 else '1') for suffix in study_file_suffixes}
+        assert set(zip(df['Direction'], df['Lane Number'])) == expected
@@ -0,0 +1,155 @@
+import argparse
+import csv
+import itertools
+import os
+import subprocess
+import time
+from datetime import datetime
+from gather_names import ColumnNames
+from main import ParseInfo
+from study_files import walk_study_files
+from synthetic_workbooks import generate_corpus
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_CORPUS_ROOT = './Benchmark Corpus'
+DEFAULT_RESULTS_FILE = './benchmark_results.csv'
+RESULT_COLUMNS = ['Timestamp', 'Commit', 'Benchmark', 'Corpus', 'Files', 'Seconds', 'Files per Second']
+START_YEAR = 2018
+END_YEAR = 2024
+
+
+def configure_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="ParseInfo Benchmark",
+        description="Times ParseInfo.parse_file, ParseInfo.create_aggregate and ColumnNames on synthetic (or real) Miovision reports"
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Number of files in each corpus')
+    parser.add_argument('--corpus-root', default=DEFAULT_CORPUS_ROOT, help='Folder the synthetic corpora are generated in (and reused from)')
+    parser.add_argument('--real-root', default=None, help='Folder containing a real ./Miovision/<year> tree, used instead of synthetic data')
+    parser.add_argument('--start-year', type=int, default=START_YEAR)
+    parser.add_argument('--end-year', type=int, default=END_YEAR)
+    parser.add_argument('--interval-minutes', type=int, default=15, help='Bin size of the synthetic reports')
+    parser.add_argument('--results-file', default=DEFAULT_RESULTS_FILE, help='CSV that every run is appended to')
+    return parser
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return ''
+
+
+def list_real_files(corpus_root:str, start_year:int, end_year:int, file_count:int) -> list[str]:
+    """
+    Return the first ``file_count`` reports of a real corpus in the './Miovision/<year>/...' form, relative to ``corpus_root``
+    """
+    working_directory = os.getcwd()
+    os.chdir(corpus_root)
+    try:
+        studies = walk_study_files(years=range(start_year, end_year + 1))
+        return [study.path for study in itertools.islice(studies, file_count)]
+    finally:
+        os.chdir(working_directory)
+
+
+def time_call(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def parse_files(files:list[str], directional_data:bool=False, dispatch_study_types:bool=True) -> None:
+    parser = ParseInfo(directional_data=directional_data)
+    if not dispatch_study_types:
+        # Every study goes through the generic intersection path
+        parser.study_type_parsers = {}
+    for file in files:
+        parser.parse_file(file)
+
+
+def create_aggregate(files:list[str], output_file:str) -> None:
+    ParseInfo().create_aggregate(files, file_name=output_file)
+
+
+def scan_column_names(start_year:int, end_year:int) -> None:
+    ColumnNames(start_year, end_year)
+
+
+def run_benchmarks(corpus_root:str, files:list[str], start_year:int, end_year:int) -> dict[str, float]:
+    """
+    Run every benchmark from inside ``corpus_root``, since the parser expects './Miovision/...' paths.
+
+    ### Returns
+    Seconds taken by each benchmark
+    """
+    working_directory = os.getcwd()
+    os.chdir(corpus_root)
+    try:
+        return {
+            'ParseInfo.parse_file' : time_call(parse_files, files),
+            'ParseInfo.parse_file directional (generic path)' : time_call(parse_files, files, True, False),
+            'ParseInfo.parse_file directional (study type paths)' : time_call(parse_files, files, True, True),
+            'ParseInfo.create_aggregate' : time_call(create_aggregate, files, './benchmark_aggregate.xlsx'),
+            'ColumnNames' : time_call(scan_column_names, start_year, end_year)
+        }
+    finally:
+        os.chdir(working_directory)
+
+
+def previous_results(results_file:str) -> dict[tuple[str, str, int], float]:
+    """
+    Return the seconds of the latest recorded run for each (benchmark, corpus, files)
+    """
+    latest = {}
+    if os.path.exists(results_file):
+        with open(results_file, newline='') as file:
+            for row in csv.DictReader(file):
+                latest[(row['Benchmark'], row['Corpus'], int(row['Files']))] = float(row['Seconds'])
+    return latest
+
+
+def record_results(results_file:str, rows:list[dict]) -> None:
+    write_header = not os.path.exists(results_file)
+    with open(results_file, mode='a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    args = configure_parser().parse_args()
+    previous = previous_results(args.results_file)
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    commit = current_commit()
+    rows = []
+
+    for size in args.sizes:
+        if args.real_root:
+            corpus_name = 'real'
+            corpus_root = args.real_root
+            files = list_real_files(corpus_root, args.start_year, args.end_year, size)
+        else:
+            corpus_name = f'synthetic-{args.interval_minutes}min'
+            corpus_root = os.path.join(args.corpus_root, f'{args.interval_minutes} min {size} files')
+            print(f'Generating {size} synthetic workbooks in {corpus_root}')
+            files = generate_corpus(corpus_root, size, start_year=args.start_year, end_year=args.end_year, interval_minutes=args.interval_minutes)
+
+        for benchmark, seconds in run_benchmarks(corpus_root, files, args.start_year, args.end_year).items():
+            rows.append({
+                'Timestamp' : timestamp,
+                'Commit' : commit,
+                'Benchmark' : benchmark,
+                'Corpus' : corpus_name,
+                'Files' : len(files),
+                'Seconds' : round(seconds, 3),
+                'Files per Second' : round(len(files) / seconds, 1) if seconds else ''
+            })
+
+            last_seconds = previous.get((benchmark, corpus_name, len(files)))
+            change = f' ({seconds / last_seconds:.2f}x the last run)' if last_seconds else ''
+            print(f'{benchmark} on {len(files)} files: {seconds:.2f}s{change}')
+
+    record_results(args.results_file, rows)
@@ -1,45 +1,50 @@
 import os
-import pandas as pd
 import time
+from schema_catalog import SchemaCatalog, direction_names
+from study_report import BREAKDOWN_SHEET_NAME, HeaderLayout, road_type
+from xlsx_stream import read_header_rows
+from study_files import walk_study_files
+
+# Column names, direction row and movement row of the breakdown sheet
+HEADER_ROW_COUNT = 3
 
 class ColumnNames:
-    def __init__(self,start_year,end_year) -> None:
+    def __init__(self,start_year,end_year,workers=os.cpu_count(),catalog_file:str=None) -> None:
         self.file_names = self.dfs_wrapper(start_year,end_year)
-        self.column_names = self.get_column_names(self.file_names)
-        self.direction_names = self.get_direction_names(self.file_names)
+        
+        # Only new or changed files are scanned when a catalog file from a previous run is given
+        self.catalog = SchemaCatalog(catalog_file=catalog_file)
+        self.catalog.update(self.file_names,workers)
+        self.catalog.save()
+        
+        self.column_names = self.catalog.get_cols(self.file_names)
+        self.direction_names = self.catalog.get_directions(self.file_names)
     
     def find_normal(self)->int:
         """
         Find files that have the direction listed in the column
         """
-        sheets = ["Total Volume Class Breakdown"]
-        directions = {
-            'North':True,
-            'East':True,
-            'West':True,
-            'South':True
-        }
+        directions = {'North','East','West','South'}
         
         normal_count = 0
         for file in self.file_names:
-            directions_found = False
-            data : dict[str,pd.DataFrame] = pd.read_excel(io=file,sheet_name=sheets)
-            total = data[sheets[0]]
-            cols = total.columns.tolist()
-            i = 0
-            while not directions_found and i < len(cols):
-                try:
-                    found = directions[cols[i]]
-                    directions_found = True
-                except:
-                    pass
+            # Only the column names are needed
+            cols = read_header_rows(file,BREAKDOWN_SHEET_NAME,nrows=1)[0]
             
-                i += 1
-        
-            if  not directions_found:
+            if directions.isdisjoint(cols):
                 normal_count += 1
                 print(f'{file} is anamoly')
         return normal_count
+    
+    def find_road_types(self)->dict[str,str]:
+        """
+        Classify every file as midblock or intersection from the header rows alone
+        """
+        road_types = {}
+        for file in self.file_names:
+            header, direction_row, movement_row = read_header_rows(file,BREAKDOWN_SHEET_NAME,nrows=HEADER_ROW_COUNT)
+            road_types[file] = road_type(HeaderLayout.from_rows(direction_row,movement_row).legs)
+        return road_types
         
     def get_cols(self)->list[str]:
         return self.column_names
@@ -47,54 +52,10 @@ class ColumnNames:
     def get_directions(self)->list[str]:
         return self.direction_names
     
-    def extract_names(self,names:dict[str,bool],file:str)->None:
-        sheet_name = "Total Volume Class Breakdown"
-        frame = pd.read_excel(io=file,sheet_name=[sheet_name],engine='openpyxl')
-        df = frame["Total Volume Class Breakdown"]
-        
-        columns_index = df.index[df['Leg'] == '% Total'].tolist()[0]
-        area_interest = frame[sheet_name].iloc[columns_index + 1:]
-        
-        
-        for i in range(area_interest.__len__()):
-            if i % 2 == 0:
-                label = area_interest['Leg'].iloc[i]
-                try:
-                    found = names[label]
-                except:
-                    names[label] = True    
-    
     def extract_direction_names(self,file:str)->list[str]:
-        df = pd.read_excel(file,sheet_name="Total Volume Class Breakdown",engine='openpyxl')
-        directions = df.iloc[0].tolist()
-        names = []
-        
-        for direction in directions:
-            if not pd.isna(direction):
-                if not direction == "Start Time":
-                    names.append(direction)
-                    
-        return names
-        
-    def get_direction_names(self,files:list[str])->list[str]:
-        distinct_names = set()
-        for file in files:
-            names = self.extract_direction_names(file=file)
-            distinct_names = distinct_names.union(names)
-            
-        return list(distinct_names)
+        # Only the header rows are read, the directions are picked out the same way as in the catalog scan
+        return direction_names(read_header_rows(file,BREAKDOWN_SHEET_NAME,nrows=2)[1])
     
-    def get_column_names(self,files:list[str])->list[str]:
-        distinct_columns = {}
-        for file in files:
-            try:
-                self.extract_names(distinct_columns,file=file)
-            except Exception as e:
-                print(e.args)
-                print(f'{file} caused a problem')
-            
-        return list(distinct_columns.keys())
-        
     def check_duplicates(self,data:list):
         duplicatates = {}
         found_html = False
@@ -108,18 +69,11 @@ class ColumnNames:
             
         return found_html
 
-    def dfs_wrapper(self,start_year,end_year)->None:
-        years = range(start_year,end_year + 1,1)
-        locations = [f'./Miovision/{year}' for year in years]
-        file_names = []
-        
-        for i in range(len(locations)):
-            for root,subs,files in os.walk(locations[i]):
-                updated_files = [root.replace('\\','/') + '/' + file for file in files]
-                file_names.extend(updated_files)
-                
-                
-        return file_names
+    def dfs_wrapper(self,start_year,end_year)->list[str]:
+        """
+        Return the paths of every study downloaded between the start and end year
+        """
+        return [study.path for study in walk_study_files(years=range(start_year,end_year + 1))]
 if __name__ == "__main__":
     cl = ColumnNames()
     
\ No newline at end of file
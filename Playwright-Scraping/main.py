@@ -2,10 +2,27 @@
 import os
 import pandas as pd
 from gather_names import ColumnNames
-from datetime import datetime
+from study_report import StudySummary, StudyReport, LayoutCache, road_type, SUMMARY_SHEET_NAME, BREAKDOWN_SHEET_NAME
+from xlsx_stream import XlsxStreamReader
+from study_index import StudyIndex
+from study_files import StudyFile, parse_study_file_name
+from schema_catalog import file_fingerprint
+
+# Study type (from the '<type>-<id>.xlsx' file name) mapped to the ParseInfo method that adds its directional data
+STUDY_TYPE_PARSERS = {}
+
+def study_type_parser(*study_types:str):
+    """
+    Register the decorated ParseInfo method as the directional data parser for the given study types
+    """
+    def register(method):
+        for study_type in study_types:
+            STUDY_TYPE_PARSERS[study_type] = method
+        return method
+    return register
 
 class ParseInfo:
-    def __init__(self,extra_cols=[]) -> None:
+    def __init__(self,extra_cols=[],layout_cache_file:str=None,directional_data=False) -> None:
         self.columns = ['Id','Study Name','Project','Location', 'Date','Time (hrs)', 'Lat', 'Long', 'Road Segment Type']
         self.directions = ['Southbound', 'Westbound', 'Northbound', 'Eastbound']
         self.movements = ['In','Out']
@@ -18,6 +35,12 @@ class ParseInfo:
         self.columns.append(final_col)
         self.columns.extend(extra_cols)
         self.files_to_delete = []
+        # Column roles of each distinct header layout, optionally kept on disk between runs
+        self.layout_cache = LayoutCache(cache_file=layout_cache_file)
+        # Barebones rows by default, directional In/Out volumes and class breakdowns only when asked for
+        self.directional_data = directional_data
+        # Types that are not registered go through the generic intersection path
+        self.study_type_parsers = dict(STUDY_TYPE_PARSERS)
         self.main_frame = pd.DataFrame(columns=self.columns)
     
     def reformat_dict(self,data_dict:dict)->dict:
@@ -31,262 +54,229 @@ class ParseInfo:
         
         return new_dict
     
-    def create_aggregate(self,files:list[str],file_name='./Miovision Aggregate Data.xlsx')->None:
+    def create_aggregate(self,files:list[str|StudyFile],file_name='./Miovision Aggregate Data.xlsx')->None:
         """
         Input a list of files and aggregate information inside.
-        Creates an excel file as the output
+        Creates an excel file as the output. The files are paths or the ``StudyFile`` entries of ``walk_study_files``.
         """
         excel_file = file_name
-        for file in files:
+        # ``files`` may be a generator such as ``walk_study_files``, so the fingerprints are taken in the same pass
+        fingerprints = {}
+        for file in map(study_file_path,files):
+            fingerprints[file_study_id(file)] = file_fingerprint(file)
             return_data = self.parse_file(file)
             if return_data:
                 new_frame = pd.DataFrame(self.reformat_dict(return_data))
                 self.main_frame = pd.concat([self.main_frame,new_frame],ignore_index=True)
             
         self.main_frame.to_excel(excel_file,index=False)
+        save_aggregate_base(self.main_frame,excel_file,fingerprints)
+        self.layout_cache.save()
+    
+    def upsert_aggregate(self,files:list[str|StudyFile],file_name='./Miovision Aggregate Data.xlsx',output_file:str=None)->tuple[list[str],list[str]]:
+        """
+        Patch an existing aggregate with the given files, keyed by ``Id``. Files that are unchanged since they were
+        last aggregated are skipped, the rest are parsed: their rows replace the existing rows with the same id, or are
+        added at the end for new studies. Studies that are now rejected lose their rows.
+
+        The aggregate is loaded from its columnar base (see ``save_aggregate_base``) when there is one, from the
+        Excel file otherwise.
+
+        ### Parameters
+        1. files : ``list[str|StudyFile]``
+            - Paths or ``StudyFile`` entries of the files that may have changed, e.g. ``study_index.paths_for_ids(changed)`` for the ids ``StudyIndex.refresh``
+            reported as changed
+        2. file_name : ``str``
+            - Existing aggregate
+        3. output_file : ``str``
+            - Where the new version is written, ``file_name`` by default
+
+        ### Returns
+        ``(<Ids replaced or added>, <Ids removed>)``
+        """
+        output_file = file_name if output_file is None else output_file
+        aggregate, fingerprints = load_aggregate_base(file_name)
+
+        stale_files = []
+        for file in map(study_file_path,files):
+            fingerprint = file_fingerprint(file)
+            study_id = file_study_id(file)
+            if fingerprints.get(study_id) != fingerprint:
+                stale_files.append(file)
+                fingerprints[study_id] = fingerprint
+
+        rows = []
+        rejected_ids = []
+        for file in stale_files:
+            return_data = self.parse_file(file)
+            if return_data:
+                rows.append(return_data)
+            else:
+                rejected_ids.append(file_study_id(file))
+
+        new_frame = pd.DataFrame(rows,columns=self.columns if not rows else None)
+        upserted_ids = list(new_frame['Id'])
+        existing_ids = aggregate['Id']
+        known_ids = set(existing_ids)
+        removed_ids = [study_id for study_id in rejected_ids if study_id in known_ids]
+
+        # Replaced rows keep their position, new rows go at the end
+        removed = set(removed_ids)
+        order = [study_id for study_id in existing_ids if study_id not in removed]
+        order.extend(study_id for study_id in upserted_ids if study_id not in known_ids)
+        aggregate = pd.concat([aggregate[~existing_ids.isin(upserted_ids + rejected_ids)],new_frame],ignore_index=True)
+        aggregate = aggregate.set_index('Id').loc[order].reset_index()
+
+        aggregate.to_excel(output_file,index=False)
+        save_aggregate_base(aggregate,output_file,fingerprints)
+        self.layout_cache.save()
+        self.main_frame = aggregate
+        return upserted_ids, removed_ids
     
     def parse_file(self,file:str)->dict:
         """
         Parse files and return dict with aggregated information or return None if not enough hours in the study
         """
-        sheets = ["Summary","Total Volume Class Breakdown"]
+        sheets = [SUMMARY_SHEET_NAME,BREAKDOWN_SHEET_NAME]
         file_breakdown = file.split('/')
         file_name = file_breakdown[-1].replace('.xlsx','')
         study_type, file_id = file_name.split('-')
-        data : dict[str,pd.DataFrame] = pd.read_excel(io=file,sheet_name=sheets)
-        summary = data[sheets[0]]
-        total = data[sheets[1]]
-        
-        # get duration of the study, if shorter than 24 hours, toss the study
-        summary_col_1 = summary.columns[0] # Contains the labels for the details of the study
-        summary_col_2 = summary.columns[1] # Contains the associated information for the labels
-        
-        start_date_time : datetime= summary[summary_col_2][summary[summary_col_1] == 'Start Time'].tolist()[0]
-        end_date_time : datetime= summary[summary_col_2][summary[summary_col_1] == 'End Time'].tolist()[0]
         
-        duration = (end_date_time - start_date_time).total_seconds()
-        one_day = 24 * 60 * 60
-        one_hour = 60*60
-        difference = abs(duration - one_day)
-
-        if difference < 60:
-            # get id and date from file name
-            sheet_data = {'Id' : file_id}
-            sheet_data['Date'] = file_breakdown[2] + '-' + file_breakdown[3] + '-' + file_breakdown[4]
-            sheet_data['Time (hrs)'] = duration/one_hour
-            sheet_data['Study Type'] = study_type
-            
-            
-            # add Study Name
-            sheet_data[summary_col_1] = summary_col_2
-            
-            
-            # add Project
-            project_index = summary.index[summary[summary_col_1] == 'Project'].tolist()[0]
-            sheet_data['Project'] = summary.iloc[project_index][summary_col_2]
-            
-            # add location
-            location_index = summary.index[summary[summary_col_1] == 'Location'].tolist()[0]
-            sheet_data['Location'] = summary.iloc[location_index][summary_col_2]
-            
-            # get lat-long
-            lat_long_index = summary.index[summary[summary_col_1] == 'Latitude and Longitude'].tolist()[0]
-            lat_long = summary.iloc[lat_long_index][summary_col_2].split(',')
-            sheet_data['Lat'] =  float(lat_long[0])
-            sheet_data['Long'] = float(lat_long[1])
-            
-            # classify as midblock or intersection
-            self.get_road_type(sheet_data,total)
-                
-            # get directional data for in
-            # grand_total_index = self.get_directional_data_in(sheet_data,total)
+        # Sheets are streamed lazily, only the small summary sheet is needed to reject a study
+        with XlsxStreamReader(file) as workbook:
+            summary = StudySummary.from_rows(list(workbook.iter_rows(sheets[0])))
             
-            # get directional data for out
-            # movement_dict = self.get_directional_data_out(sheet_data,total)
+            # get duration of the study, if shorter than 24 hours, toss the study
+            duration = summary.duration_seconds()
+            one_day = 24 * 60 * 60
+            one_hour = 60*60
+            difference = abs(duration - one_day)
             
-            # make directional adjusted out
-            # if int(file_id) == 195222:
-            #     print("Jere")
-            # self.directional_out_adjusted(sheet_data,total)
+            if difference >= 60:
+                self.files_to_delete.append(file)
+                return None
             
-            # add the int total, assume that it is in the last column
-            # grand_total = int(total.iloc[grand_total_index][total.columns[-1]].iloc[0])
-            # sheet_data['Int. Total'] = grand_total
-            
-            # Extract vehicle class breakdown for all of the directions combined
-            # self.extract_attributes(sheet_data,total)
-            
-            # Update the in volumes to fill in gaps for pedestrian studies 
-            # self.update_directional_data_in(sheet_data,movement_dict)
-            
-            # Show the opposite direction in and out for one-ways
-            # self.detect_one_ways(sheet_data)
-            
-            return sheet_data
-        else:
-            self.files_to_delete.append(file)
-            return None
+            # Only the header, Grand Total and class rows of the breakdown sheet are read, every extractor reads from the report
+            report = StudyReport.from_rows(summary,workbook.read_breakdown_rows(sheets[1]),self.layout_cache)
+        
+        # get id and date from file name
+        sheet_data = {'Id' : file_id}
+        sheet_data['Date'] = file_breakdown[2] + '-' + file_breakdown[3] + '-' + file_breakdown[4]
+        sheet_data['Time (hrs)'] = duration/one_hour
+        sheet_data['Study Type'] = study_type
+        
+        
+        # add Study Name
+        sheet_data[summary.name_label] = summary.name
+        
+        
+        # add Project
+        sheet_data['Project'] = summary.fields['Project']
+        
+        # add location
+        sheet_data['Location'] = summary.fields['Location']
+        
+        # get lat-long
+        sheet_data['Lat'], sheet_data['Long'] = summary.lat_long()
+        
+        # classify as midblock or intersection
+        self.get_road_type(sheet_data,report)
+        
+        if self.directional_data:
+            parse_directional_data = self.study_type_parsers.get(study_type,ParseInfo.parse_intersection)
+            parse_directional_data(self,sheet_data,report)
+        
+        return sheet_data
     
-    def return_adjusted_volume(self,total:pd.DataFrame):
+    @study_type_parser('TMC')
+    def parse_intersection(self,data_dict:dict,report:StudyReport):
         """
-        For given file, return the breakdown of the total row excluding the
-        Omitted classes: Bikes on road, peds, and bikes on crosswalk
+        Directional data for turning movement counts, the Out volumes are rebuilt from the movements of the other legs
         """
+        # get directional data for in
+        self.get_directional_data_in(data_dict,report)
         
-        # classes to ommit
-        omission_classes = {"Bicycles on Road":'', "Pedestrians":'',"Bicycles on Crosswalk":''}
-        directions = ['Southbound','Westbound','Northbound','Eastbound']
-        
-        # Retrieve the rows containing the total col and breakdowns
-        # Retreive the last col which is the column of interest for us
-        grand_total_index = total.index[total['Leg']=='Grand Total'].tolist()[0]
-        grand_total = total.loc[grand_total_index,total.columns[-1]]
-        row_index = total.index[total['Leg'] == '% Total'].tolist()[0]
-        labels = total.iloc[row_index + 1:]['Leg'].tolist()
-        totals = total.iloc[row_index + 1:][total.columns[-1]].tolist()
-        
-        
-        for i in range(len(labels)):
-            # only even rows have values, odd rows have percentages
-            if i % 2 == 0 and labels[i] in omission_classes:
-                # only if data is not for Pedestrians and Bicycles on Crosswalk
-                if pd.notna(totals[i]):
-                    try:
-                        grand_total -= int(totals[i])
-                    except:
-                        print('Problem in return_adjusted_volume')
-        
-        return grand_total
-                    
-                
+        # get directional data for out
+        movement_dict = self.get_directional_data_out(data_dict,report)
+        
+        # make directional adjusted out
+        self.directional_out_adjusted(data_dict,report)
+        
+        # add the int total, assume that it is in the last column
+        data_dict['Int. Total'] = report.int_total()
+        
+        # Extract vehicle class breakdown for all of the directions combined
+        self.extract_attributes(data_dict,report)
+        
+        # Update the in volumes to fill in gaps for pedestrian studies 
+        self.update_directional_data_in(data_dict,movement_dict)
+        
+        # Show the opposite direction in and out for one-ways
+        self.detect_one_ways(data_dict)
     
-    def get_directional_data_out(self,data_dict:dict,total:pd.DataFrame):
+    @study_type_parser('ATR')
+    def parse_midblock(self,data_dict:dict,report:StudyReport):
         """
-        Get out data for each dimension, which really means all the flow going in the opposite direction
-        Super confusing even to me, but hey, that's how they asked for it.
+        Directional data for midblock counts. With no turning movements, the traffic leaving through a direction is the
+        Thru traffic coming in from the opposite direction, so the Out volumes are read straight off the Thru totals.
+        Reports that do have turning movements go through the intersection path.
         """
-        direction_num_mapping = {
-            'Southbound In' : 1,
-            'Westbound In' : 2,
-            'Northbound In' : 3,
-            'Eastbound In' : 4
+        if len(report.legs) > 2 or any(not movement.endswith(' Thru') for movement in report.movement_columns):
+            return self.parse_intersection(data_dict,report)
+        
+        opposite_direction = {
+            'Southbound' : 'Northbound',
+            'Northbound' : 'Southbound',
+            'Westbound' : 'Eastbound',
+            'Eastbound' : 'Westbound'
         }
         
-        num_direction_mapping = {
-            1 : 'Southbound',
-            2 : 'Westbound',
-            3 : 'Northbound',
-            4 : 'Eastbound'
-        }
+        # get directional data for in
+        self.get_directional_data_in(data_dict,report)
         
-        movements = {
-            'Right' : True,
-            'Thru' : True,
-            'Left' : True,
-            'U-Turn' : True
-
-        }
+        # the out of each direction is the thru of the opposite one, with and without the omitted classes. Only the
+        # thru columns are summed and adjusted, the midblock has no other movement.
+        thru_columns = {direction : report.movement_columns.get(f'{direction[0]} Thru',[]) for direction in report.legs}
+        columns = [col for cols in thru_columns.values() for col in cols]
+        thru_totals = report.grand_total[columns]
+        adjusted_thru_totals = self.return_adjusted_volume(report,columns)
         
-        total_row_index = total.index[total['Leg'] == 'Grand Total'].tolist()[0]
-        direction_row = 0
-        start_row = 1
-        directions = []
         movement_dict = {}
-        cols = total.columns.tolist()
-        valid_direction_flag = False
-        last_direction = ''
-        
-        # if data_dict['Date'] == '2022/10/17':
-        #     print(total.head())
-        
-        # populate the movement column
-        for col in cols:
-            # try to add last direction to last_direction
-            direction = total.iloc[direction_row][col]
-            movement = total.iloc[start_row][col]
-            try:
-                found = direction_num_mapping[f'{direction} In']
-                last_direction = direction
-                valid_direction_flag = True
-            except:
-                if type(direction) == type(str()):
-                    if 'bound' in direction:
-                        valid_direction_flag = False
-                pass
-            
-            try:
-                # Check to see if we've hit the last column for the direction
-                # If so the valid direction should be set to false
-                if valid_direction_flag:            
-                    # Edge case for some files where instead of the 'Thru' Column, it has it under 'Direction'            
-                    if movement == 'Direction':
-                        movement_dict[f'{last_direction[0]} Thru'] = total.iloc[total_row_index][col]
-                    else:
-                        found = movements[movement]
-                        move = f'{last_direction[0]} {movement}'
-                        
-                        # This way, even if there are multiple movements detected, we add them up
-                        if move in movement_dict:
-                            movement_dict[move] += total.iloc[total_row_index][col]
-                        else:
-                            movement_dict[move] = total.iloc[total_row_index][col]
-            except:
-                pass
-
-        for column in list(data_dict.keys()):
-            try:
-                direction_num = direction_num_mapping[column]
-                directions.append(direction_num)
-            except:
-                pass
+        adjusted_movement_dict = {}
+        start = 0
+        for direction, cols in thru_columns.items():
+            if cols:
+                movement_dict[f'{direction[0]} Thru'] = thru_totals[start:start + len(cols)].sum()
+                adjusted_movement_dict[f'{direction[0]} Thru'] = adjusted_thru_totals[start:start + len(cols)].sum()
+            start += len(cols)
+        
+        for direction in report.legs:
+            data_dict[f'{direction} Out'] = movement_dict.get(f'{opposite_direction[direction][0]} Thru',0)
+        for direction in report.legs:
+            data_dict[f'{direction} Adj. Out'] = adjusted_movement_dict.get(f'{opposite_direction[direction][0]} Thru',0)
+        
+        data_dict['Int. Total'] = report.int_total()
+        self.extract_attributes(data_dict,report)
+        
+        # Update the in volumes for reports whose App Total falls short of the Thru
+        self.update_directional_data_in(data_dict,movement_dict)
+        self.detect_one_ways(data_dict)
+    
+    def return_adjusted_volume(self,report:StudyReport,cols:list[int]=None):
+        """
+        For given report, return the total row (one value per column, or per column of ``cols``) excluding the
+        Omitted classes: Bikes on road, peds, and bikes on crosswalk
+        """
         
-
+        # classes to ommit
+        omission_classes = {"Bicycles on Road", "Pedestrians","Bicycles on Crosswalk"}
         
-        for direction in directions:
-            # get directions for calculations
-            out_total = 0
-            thru_direction = direction + 2
-            if thru_direction == 6:
-                thru_direction = 2
-            elif thru_direction == 5:
-                thru_direction = 1
-            uturn_direction = direction + 0
-            counter_clockwise_direction = direction - 1
-            if counter_clockwise_direction < 1:
-                counter_clockwise_direction = 4
-            clockwise_direction = direction + 1
-            if clockwise_direction > 4:
-                clockwise_direction = 1
-            
-            # try to add each direction
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[thru_direction][0]} Thru']
-            except:
-                pass
-                
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[counter_clockwise_direction][0]} Left']
-            except:
-                pass
-            
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[clockwise_direction][0]} Right']
-            except:
-                pass
-            
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[uturn_direction][0]} U-Turn']
-            except:
-                pass
-            
-            data_dict[f'{num_direction_mapping[direction]} Out'] = out_total
-        return movement_dict
+        return report.adjusted_totals(omission_classes,cols)
     
-    def directional_out_adjusted(self,data_dict:dict,total:pd.DataFrame):
+    def add_out_volumes(self,data_dict:dict,movement_dict:dict,suffix:str):
         """
-        Does the same task as get_directional_data_out with tweaks large enough that 
-        a new function needed to be created to make new columns that contain adjusted out volume
-        rows.
+        For each direction in the row, add up all the movements exiting through that direction and store it under
+        ``'<Direction> <suffix>'``
         """
         direction_num_mapping = {
             'Southbound In' : 1,
@@ -302,72 +292,7 @@ class ParseInfo:
             4 : 'Eastbound'
         }
         
-        movements = {
-            'Right' : True,
-            'Thru' : True,
-            'Left' : True,
-            'U-Turn' : True
-
-        }
-        
-        total_row_index = total.index[total['Leg'] == 'Grand Total'].tolist()[0]
-        direction_row = 0
-        start_row = 1
-        directions = []
-        movement_dict = {}
-        cols = total.columns.tolist()
-        valid_direction_flag = False
-        last_direction = ''
-        
-        # if data_dict['Date'] == '2022/10/17':
-        #     print(total.head())
-        
-        # populate the movement column
-        for col in cols:
-            # try to add last direction to last_direction
-            direction = total.iloc[direction_row][col]
-            movement = total.iloc[start_row][col]
-            try:
-                found = direction_num_mapping[f'{direction} In']
-                last_direction = direction
-                valid_direction_flag = True
-            except:
-                # Only stop reading data, aka valid_direction_flag = False,
-                # When a direction is found that is not either
-                # NB,SB,EB,WB
-                if type(direction) == type(str()):
-                    if 'bound' in direction:
-                        valid_direction_flag = False
-                pass
-            
-            try:
-                # Check to see if we've hit the last column for the direction
-                # If so the valid direction should be set to false
-                if valid_direction_flag:            
-                    # Edge case for some files where instead of the 'Thru' Column, it has it under 'Direction'
-                    adjusted_value = self.return_adjusted_volume(total.loc[:,:col])            
-                    if movement == 'Direction':
-                        movement_dict[f'{last_direction[0]} Thru'] = adjusted_value
-                    else:
-                        found = movements[movement]
-                        move = f'{last_direction[0]} {movement}'
-                        
-                        # This way, even if there are multiple movements detected, we add them up
-                        if move in movement_dict:
-                            movement_dict[move] += adjusted_value
-                        else:
-                            movement_dict[move] = adjusted_value
-            except:
-                pass
-
-        for column in list(data_dict.keys()):
-            try:
-                direction_num = direction_num_mapping[column]
-                directions.append(direction_num)
-            except:
-                pass
-        
-
+        directions = [direction_num_mapping[column] for column in list(data_dict.keys()) if column in direction_num_mapping]
         
         for direction in directions:
             # get directions for calculations
@@ -385,58 +310,38 @@ class ParseInfo:
             if clockwise_direction > 4:
                 clockwise_direction = 1
             
-            # try to add each direction
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[thru_direction][0]} Thru']
-            except:
-                pass
-                
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[counter_clockwise_direction][0]} Left']
-            except:
-                pass
-            
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[clockwise_direction][0]} Right']
-            except:
-                pass
-            
-            try:
-                out_total += movement_dict[f'{num_direction_mapping[uturn_direction][0]} U-Turn']
-            except:
-                pass
-            
-            data_dict[f'{num_direction_mapping[direction]} Adj. Out'] = out_total
-            
+            # add each direction that is present
+            out_total += movement_dict.get(f'{num_direction_mapping[thru_direction][0]} Thru',0)
+            out_total += movement_dict.get(f'{num_direction_mapping[counter_clockwise_direction][0]} Left',0)
+            out_total += movement_dict.get(f'{num_direction_mapping[clockwise_direction][0]} Right',0)
+            out_total += movement_dict.get(f'{num_direction_mapping[uturn_direction][0]} U-Turn',0)
             
+            data_dict[f'{num_direction_mapping[direction]} {suffix}'] = out_total
+    
+    def get_directional_data_out(self,data_dict:dict,report:StudyReport):
+        """
+        Get out data for each dimension, which really means all the flow going in the opposite direction
+        Super confusing even to me, but hey, that's how they asked for it.
+        """
+        movement_dict = report.movement_totals()
+        self.add_out_volumes(data_dict,movement_dict,'Out')
+        return movement_dict
     
-    def get_road_type(self,data_dict:dict,total:pd.DataFrame):
+    def directional_out_adjusted(self,data_dict:dict,report:StudyReport):
+        """
+        Does the same task as get_directional_data_out with tweaks large enough that 
+        a new function needed to be created to make new columns that contain adjusted out volume
+        rows.
+        """
+        movement_dict = report.movement_totals(self.return_adjusted_volume(report))
+        self.add_out_volumes(data_dict,movement_dict,'Adj. Out')
+    
+    def get_road_type(self,data_dict:dict,report:StudyReport):
         """
         Classifies file as intersection or midblock
         """
-        directions = {
-            'Northbound':True,
-            'Eastbound':True,
-            'Westbound':True,
-            'Southbound':True
-        }
-        
-        
-        cols = total.iloc[0].tolist()
         column_name = "Road Segment Type"
-        
-
-        i = 0
-        number_of_legs = 0
-        while i < len(cols):
-            if cols[i] in directions:
-                number_of_legs += 1
-            i += 1
-        
-        if number_of_legs == 2:
-            data_dict[column_name] = "Midblock"
-        else:
-            data_dict[column_name] = "Intersection"
+        data_dict[column_name] = road_type(report.legs)
     
     def update_directional_data_in(self,data_dict:dict,movement_dict:dict):
         """
@@ -476,53 +381,14 @@ class ParseInfo:
                     data_dict[f'{direction} In'] = new_total_in
                         
     
-    def get_directional_data_in(self,data_dict:dict,total:pd.DataFrame):
+    def get_directional_data_in(self,data_dict:dict,report:StudyReport):
         """
-        Add the directional data to the row, and return the row index for the grand total
+        Add the directional data to the row, along with the vehicle class breakdown of each direction
         """
-        directions = {
-            'Northbound':True,
-            'Eastbound':True,
-            'Westbound':True,
-            'Southbound':True
-        }
-        cols = total.columns.tolist()
-        directions_present = []
-        directions_total = []
-        app_totals_index = []
-        
-        direction_row = 0
-        grand_total_index = total.index[total[cols[0]] == 'Grand Total']
-        start_row = 1
-        
-        # Create a flag to only allow app data to be read when one of the four directions that we care about has been read
-        found_direction = False
-        
-        # Turn it off after the app data column has been read
-        
-        for i,col in enumerate(cols):
-            direction_name = total.iloc[direction_row][col]
-            start_name = total.iloc[start_row][col]
-            try:
-                found = directions[direction_name]
-                directions_present.append(direction_name)
-                found_direction = True
-            except:
-                if type(direction_name) == type(''):          
-                  if 'bound' in direction_name:
-                    found_direction = False
-                pass
-
-            if start_name == 'App Total' and found_direction:
-                app_totals_index.append(i + 1)
-                directions_total.append(int(total.iloc[grand_total_index][col].iloc[0]))
-        
-        for i in range(len(directions_present)):
-            data_dict[f'{directions_present[i]} In'] = directions_total[i]
-            self.extract_attributes(data_dict,total.iloc[:,:app_totals_index[i]],modifier=f'{directions_present[i][0]} ')
-            
-            
-        return grand_total_index
+        for i,direction in enumerate(report.legs):
+            app_total_col = report.app_total_columns[i]
+            data_dict[f'{direction} In'] = int(report.grand_total[app_total_col])
+            self.extract_attributes(data_dict,report,col=app_total_col,modifier=f'{direction[0]} ')
     
     def detect_one_ways(self,data_dict:dict):
         """
@@ -563,58 +429,71 @@ class ParseInfo:
             data_dict[f'{num_direction_mapping[opposite_direction]} In'] = 0
         
     
-    def extract_attributes(self,data_dict:dict,total:pd.DataFrame,modifier=''):
+    def extract_attributes(self,data_dict:dict,report:StudyReport,col=-1,modifier=''):
         """
-        Function extracting the vehicle class breakdown for the given scope of data
+        Function extracting the vehicle class breakdown for the given column of data, the
+        intersection total by default
         """
-        row_index = total.index[total['Leg'] == '% Total'].tolist()[0]
-        labels = total.iloc[row_index + 1:]['Leg'].tolist()
-        totals = total.iloc[row_index + 1:][total.columns[-1]].tolist()
-        
-        
-        for i in range(len(labels)):
-            # only even rows have values, odd rows have percentages
-            if i % 2 == 0:
-                # only if data is not for Pedestrians and Bicycles on Crosswalk
-                if pd.notna(totals[i]):
-                    try:
-                        data_dict[modifier + labels[i]] = int(totals[i])
-                    except:
-                        print('here')
+        # only classes with data are returned, e.g. Pedestrians and Bicycles on Crosswalk are left out
+        for label,value in report.class_breakdown(col).items():
+            data_dict[modifier + label] = int(value)
     
     def delete_files(self):
         for file in self.files_to_delete:
             os.remove(file)
 
 
-def get_error_files(files:list[str],errors:pd.DataFrame)->list[str]:
+def study_file_path(file:str|StudyFile)->str:
+    return file.path if isinstance(file,StudyFile) else file
+
+def file_study_id(file:str)->str:
+    return parse_study_file_name(os.path.basename(file))[1]
+
+def aggregate_base_file(file_name:str)->str:
     """
-    Receive the list of all file locations, return the ones with errors
+    Columnar copy of an aggregate, stored next to the Excel file
     """
-    keys = list(errors["ID"])
+    return os.path.splitext(file_name)[0] + '.pkl'
 
-    # Creating the dictionary with random values
-    random_dict = {str(key): ' ' for key in keys}
+def save_aggregate_base(aggregate:pd.DataFrame,file_name:str,fingerprints:dict[str,list[int]])->None:
+    """
+    Pickle the aggregate next to its Excel file, along with the fingerprint of the file each study was parsed from.
+    Loading it back keeps the column types and is much faster than reading the Excel file.
+    """
+    aggregate = aggregate.copy()
+    aggregate.attrs['fingerprints'] = fingerprints
+    aggregate.to_pickle(aggregate_base_file(file_name))
 
-    
-    return_list = []
-    # Each file looks like this: './YYYY/MM/DD/ID.xlsx'
-    
-    for file in files:
-        splits = file.split('/')
-        file_id = splits[-1].split('.')[0]
-        if file_id in random_dict:
-            return_list.append(file)
-    
-    return return_list
+def load_aggregate_base(file_name:str)->tuple[pd.DataFrame,dict[str,list[int]]]:
+    """
+    Load the aggregate from its columnar base, or from the Excel file when it has none (every study then counts as changed)
+
+    ### Returns
+    ``(<Aggregate>, <Fingerprint of each study id>)``
+    """
+    base_file = aggregate_base_file(file_name)
+    if os.path.exists(base_file):
+        aggregate = pd.read_pickle(base_file)
+        fingerprints = aggregate.attrs.pop('fingerprints',{})
+        return aggregate, fingerprints
+
+    return pd.read_excel(file_name,dtype={'Id': str}), {}
+
+def get_error_files(study_index:StudyIndex,errors:pd.DataFrame)->list[str]:
+    """
+    Look up the files of the studies listed in the errors sheet, ids that were not downloaded are skipped
+    """
+    return study_index.paths_for_ids(errors["ID"])
         
 if __name__ == "__main__":
     cols = ColumnNames(start_year=2018,end_year=2024)
     print(cols.get_directions())
     # pi = ParseInfo(cols.get_cols())
-    # files = cols.file_names
+    # study_index = StudyIndex('Study Index.json')
+    # study_index.refresh()
+    # study_index.save()
     # errors = pd.read_excel('Errors.xlsx')
-    # files = get_error_files(files,errors)
+    # files = get_error_files(study_index,errors)
     # pi.create_aggregate(files,file_name="Barebones Data 2018-2024.xlsx")
     # pi.delete_files()
 
@@ -0,0 +1,142 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from multiprocessing.pool import Pool
+from study_files import parse_study_file_name
+from study_index import StudyIndex
+from study_report import BREAKDOWN_SHEET_NAME, HeaderLayout
+from xlsx_stream import XlsxStreamReader
+
+# Approaches in clockwise order, so that the approach to the right of another one is the next one
+APPROACHES = ['Southbound', 'Westbound', 'Northbound', 'Eastbound']
+TURNS = ['Right', 'Thru', 'Left', 'U-Turn']
+# Traffic leaving through direction d made turn t from approach (d + APPROACH_SHIFTS[t]) % 4
+APPROACH_SHIFTS = np.array([1, 2, -1, 0])
+OUT_COLS = [f'{approach} Out' for approach in APPROACHES]
+
+def read_turning_movements(file:str)->tuple[str,np.ndarray,np.ndarray]:
+    """
+    Read the grand total of each turning movement of a report
+
+    ### Returns
+    ``(<ID>, <4x4 volumes, approaches by turns>, <Whether each approach is a leg of the study>)``, or ``None`` if the
+    file could not be read
+    """
+    study_id = parse_study_file_name(os.path.basename(file))[1]
+    try:
+        with XlsxStreamReader(file) as workbook:
+            rows = workbook.read_breakdown_rows(BREAKDOWN_SHEET_NAME)
+    except Exception as e:
+        print(e.args)
+        print(f'{file} caused a problem')
+        return None
+
+    layout = HeaderLayout.from_rows(rows.direction_row, rows.movement_row)
+    grand_total = pd.to_numeric(pd.Series(rows.grand_total_row), errors='coerce').to_numpy(dtype=float)
+    approach_index = {approach[0]: i for i, approach in enumerate(APPROACHES)}
+
+    volumes = np.zeros((len(APPROACHES), len(TURNS)))
+    for movement, cols in layout.movement_columns.items():
+        approach, turn = movement.split(' ', 1)
+        if turn in TURNS:
+            volumes[approach_index[approach], TURNS.index(turn)] += np.nansum(grand_total[cols])
+
+    legs = np.array([approach in layout.legs for approach in APPROACHES])
+    return study_id, volumes, legs
+
+def exit_totals(volumes:np.ndarray)->np.ndarray:
+    """
+    Compute the exit total of every direction of every study at once
+
+    ### Parameters
+    1. volumes : ``np.ndarray``
+        - Turning movement volumes of shape ``(<Studies>, 4, 4)``, approaches in the order of ``APPROACHES`` by turns
+        in the order of ``TURNS``
+
+    ### Returns
+    An array of shape ``(<Studies>, 4)``, directions in the order of ``APPROACHES``
+    """
+    directions = np.arange(len(APPROACHES))
+    # source_approach[d, t] is the approach whose turn t exits through direction d
+    source_approach = (directions[:, None] + APPROACH_SHIFTS[None, :]) % len(APPROACHES)
+    return volumes[:, source_approach, np.arange(len(TURNS))].sum(axis=2)
+
+def read_corpus(files:list[str],workers:int=os.cpu_count())->tuple[list[str],np.ndarray,np.ndarray]:
+    """
+    Read the turning movements of every file, fanned out across a process pool
+
+    ### Returns
+    ``(<IDs>, <Volumes of shape (n, 4, 4)>, <Legs of shape (n, 4)>)`` for the files that could be read
+    """
+    if workers and workers > 1 and len(files) > 1:
+        with Pool(workers) as pool:
+            results = list(pool.imap(read_turning_movements, files, chunksize=max(1, len(files) // (workers * 4))))
+    else:
+        results = [read_turning_movements(file) for file in files]
+
+    results = [result for result in results if result is not None]
+    if not results:
+        return [], np.zeros((0, len(APPROACHES), len(TURNS))), np.zeros((0, len(APPROACHES)), dtype=bool)
+    ids, volumes, legs = zip(*results)
+    return list(ids), np.stack(volumes), np.stack(legs)
+
+def validate_offline(aggregate:pd.DataFrame,files:list[str],workers:int=os.cpu_count())->pd.DataFrame:
+    """
+    Recompute the Out volume of every direction from the downloaded reports and compare it with the aggregate
+
+    ### Parameters
+    1. aggregate : ``pd.DataFrame``
+        - Aggregate with directional data, the study ids in the first column
+    2. files : ``list[str]``
+        - Reports of the studies in the aggregate, the others are ignored
+
+    ### Returns
+    One row per study of the aggregate that has a report, with the recomputed ('Calc. <Direction> Out') and aggregated
+    ('Agg. <Direction> Out') volumes of its legs, and the directions that do not match
+    """
+    id_col = aggregate.columns[0]
+    estimates = aggregate[[id_col] + OUT_COLS].drop_duplicates(id_col)
+    estimates[id_col] = estimates[id_col].astype(str)
+    known_ids = set(estimates[id_col])
+    files = [file for file in files if parse_study_file_name(os.path.basename(file))[1] in known_ids]
+
+    ids, volumes, legs = read_corpus(files, workers)
+    calculated = np.where(legs, exit_totals(volumes), np.nan)
+    aggregated = estimates.set_index(id_col).loc[ids, OUT_COLS].to_numpy(dtype=float)
+    aggregated = np.where(legs, aggregated, np.nan)
+
+    # A leg without a value in the aggregate is a mismatch as well
+    mismatch = legs & ~np.isclose(calculated, aggregated, equal_nan=False)
+    mismatched_directions = np.where(mismatch, np.array(APPROACHES, dtype=object), '')
+
+    validation = pd.DataFrame({'ID': ids})
+    for i, col in enumerate(OUT_COLS):
+        validation[f'Calc. {col}'] = calculated[:, i]
+        validation[f'Agg. {col}'] = aggregated[:, i]
+    validation['Mismatch'] = mismatch.any(axis=1)
+    validation['Mismatched Directions'] = [', '.join(filter(None, row)) for row in mismatched_directions]
+    return validation
+
+def configure_parser()->argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="Offline Validation",
+        description="Checks the Out volumes of an aggregate against the turning movements of the downloaded reports"
+    )
+    parser.add_argument('aggregate_file', help='Aggregate created with directional data')
+    parser.add_argument('--output-file', default='Offline Validation.xlsx')
+    parser.add_argument('--index-file', default=None, help='Study index to look the reports up in, rebuilt when missing')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    return parser
+
+if __name__ == "__main__":
+    args = configure_parser().parse_args()
+    aggregate = pd.read_excel(args.aggregate_file)
+
+    study_index = StudyIndex(args.index_file)
+    study_index.refresh()
+    study_index.save()
+
+    validation = validate_offline(aggregate, study_index.paths_for_ids(aggregate.iloc[:, 0]), args.workers)
+    print(f"{validation['Mismatch'].sum()} of {len(validation)} studies do not match")
+    validation.to_excel(args.output_file, index=False)
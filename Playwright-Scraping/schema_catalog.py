@@ -0,0 +1,121 @@
+import json
+import os
+from multiprocessing.pool import Pool
+from study_report import BREAKDOWN_SHEET_NAME
+from xlsx_stream import XlsxStreamReader
+
+def file_fingerprint(file:str)->list[int]:
+    """
+    Size and modification time of the file, which change whenever the file is re-downloaded
+    """
+    stat = os.stat(file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def direction_names(direction_row:list)->list[str]:
+    """
+    Direction names of the direction row of a breakdown sheet, without its empty cells and 'Start Time' label
+    """
+    return [direction for direction in direction_row if direction is not None and direction != "Start Time"]
+
+def scan_file(file:str)->tuple[list[str],list[str]]:
+    """
+    Read the class labels and direction names of a file in a single pass over the breakdown sheet
+
+    ### Returns
+    ``(<Class labels>, <Direction names>)``, or ``None`` if the file could not be read
+    """
+    try:
+        with XlsxStreamReader(file) as workbook:
+            rows = workbook.read_breakdown_rows(BREAKDOWN_SHEET_NAME)
+    except Exception as e:
+        print(e.args)
+        print(f'{file} caused a problem')
+        return None
+
+    # only even rows have labels, odd rows have percentages
+    labels = [row[0] for row in rows.class_rows[::2] if row[0] is not None]
+    directions = direction_names(rows.direction_row)
+
+    return labels,directions
+
+def scan_files(files:list[str],workers:int)->list[tuple[list[str],list[str]]]:
+    """
+    Run ``scan_file`` on every file, fanned out across a process pool. Results are in the same order as ``files``.
+    """
+    if workers and workers > 1 and len(files) > 1:
+        with Pool(workers) as pool:
+            return list(pool.imap(scan_file,files,chunksize=max(1,len(files) // (workers * 4))))
+    return [scan_file(file) for file in files]
+
+class SchemaCatalog:
+    """
+    On-disk catalog of the class labels and direction names that each file contributed, keyed by file path and
+    fingerprint. Only files that are new or changed since the last update are scanned.
+
+    Without a ``catalog_file``, the catalog only lives in memory.
+    """
+    def __init__(self,catalog_file:str=None) -> None:
+        self.catalog_file = catalog_file
+        self.entries : dict[str,dict] = {}
+
+        if catalog_file and os.path.exists(catalog_file):
+            with open(catalog_file) as file:
+                self.entries = json.load(file)['files']
+
+    def update(self,files:list[str],workers:int=os.cpu_count())->list[str]:
+        """
+        Scan the files that are not in the catalog or whose fingerprint changed
+
+        ### Returns
+        The files that were scanned
+        """
+        fingerprints = {file: file_fingerprint(file) for file in files}
+        stale_files = [file for file in files if file not in self.entries or self.entries[file]['fingerprint'] != fingerprints[file]]
+
+        for file, result in zip(stale_files,scan_files(stale_files,workers)):
+            if result is None:
+                # Leave failed files out so they are scanned again next time
+                self.entries.pop(file,None)
+                continue
+            labels, directions = result
+            self.entries[file] = {'fingerprint': fingerprints[file], 'labels': labels, 'directions': directions}
+
+        return stale_files
+
+    def prune(self,files:list[str])->None:
+        """
+        Drop the entries of files that are not in ``files`` anymore
+        """
+        keep = set(files)
+        self.entries = {file: entry for file, entry in self.entries.items() if file in keep}
+
+    def save(self)->None:
+        if self.catalog_file:
+            with open(self.catalog_file,mode='w') as file:
+                json.dump({'files': self.entries},file)
+
+    def distinct(self,key:str,files:list[str]=None)->list[str]:
+        """
+        Distinct values of ``key`` ('labels' or 'directions') for the files, in the order they were first found
+        """
+        files = self.entries.keys() if files is None else files
+        values = {}
+        for file in files:
+            if file in self.entries:
+                values.update(dict.fromkeys(self.entries[file][key],True))
+        return list(values.keys())
+
+    def get_cols(self,files:list[str]=None)->list[str]:
+        return self.distinct('labels',files)
+
+    def get_directions(self,files:list[str]=None)->list[str]:
+        return self.distinct('directions',files)
+
+    def files_with_label(self,label:str)->list[str]:
+        """
+        Files containing the vehicle class label, e.g. for targeted reprocessing
+        """
+        return [file for file, entry in self.entries.items() if label in entry['labels']]
+
+    def files_with_direction(self,direction:str)->list[str]:
+        return [file for file, entry in self.entries.items() if direction in entry['directions']]
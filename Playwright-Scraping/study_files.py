@@ -0,0 +1,106 @@
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+MIOVISION_BASE_FOLDER = './Miovision'
+STUDY_FILE_EXTENSION = '.xlsx'
+
+@dataclass(frozen=True)
+class StudyFile:
+    """
+    A downloaded study stored as ``<base>/<YYYY>/<MM>/<DD>/<Study Type>-<ID>.xlsx``
+    """
+    year : int
+    month : int
+    day : int
+    study_type : str
+    study_id : str
+    path : str
+    size : int
+    mtime : float
+
+    @property
+    def date(self) -> str:
+        return f'{self.year:04d}-{self.month:02d}-{self.day:02d}'
+
+def parse_study_file_name(file_name:str) -> tuple[str,str]:
+    """
+    Split '<Study Type>-<ID>.xlsx' into ``(<Study Type>, <ID>)``, or return ``None`` if the name is not in that form
+    """
+    if not file_name.endswith(STUDY_FILE_EXTENSION):
+        return None
+    parts = file_name[:-len(STUDY_FILE_EXTENSION)].split('-')
+    if len(parts) != 2 or not all(parts):
+        return None
+    return parts[0], parts[1]
+
+def scan_numbered_folders(folder:str, allowed:set[int]=None) -> Iterator[tuple[int,str,str]]:
+    """
+    Yield ``(<number>, <name>, <path>)`` for the numbered sub folders (years, months or days), in order
+    """
+    try:
+        with os.scandir(folder) as entries:
+            folders = [(int(entry.name), entry.name) for entry in entries if entry.is_dir() and entry.name.isdigit()]
+    except FileNotFoundError:
+        return
+
+    for number, name in sorted(folders):
+        if allowed is None or number in allowed:
+            yield number, name, f'{folder}/{name}'
+
+def walk_study_files(base_folder:str=MIOVISION_BASE_FOLDER, years:Iterable[int]=None, months:Iterable[int]=None,
+                     days:Iterable[int]=None, study_types:Iterable[str]=None, study_ids:Iterable[str]=None) -> Iterator[StudyFile]:
+    """
+    Lazily walk the downloaded studies, yielding each one as soon as it is found. Folders outside of the
+    year/month/day filters are never opened.
+
+    ### Parameters
+    1. base_folder : ``str``
+        - Folder holding the ``<YYYY>/<MM>/<DD>`` tree, paths are built from it with '/' separators
+    2. years, months, days : ``Iterable[int]``
+        - Only walk these folders, all of them when ``None``
+    3. study_types, study_ids : ``Iterable[str]``
+        - Only yield studies of these types / with these ids, all of them when ``None``
+
+    ### Returns
+    An iterator of ``StudyFile`` ordered by date then file name. Files that are not named '<Study Type>-<ID>.xlsx' are skipped.
+    """
+    years = None if years is None else set(years)
+    months = None if months is None else set(months)
+    days = None if days is None else set(days)
+    study_types = None if study_types is None else set(study_types)
+    study_ids = None if study_ids is None else {str(study_id) for study_id in study_ids}
+
+    for year, _, year_folder in scan_numbered_folders(base_folder, years):
+        for month, _, month_folder in scan_numbered_folders(year_folder, months):
+            for day, _, day_folder in scan_numbered_folders(month_folder, days):
+                yield from scan_day_folder(day_folder, year, month, day, study_types, study_ids)
+
+def scan_day_folder(day_folder:str, year:int, month:int, day:int, study_types:set[str]=None, study_ids:set[str]=None) -> Iterator[StudyFile]:
+    """
+    Yield the studies stored in a single ``<YYYY>/<MM>/<DD>`` folder, ordered by file name
+    """
+    with os.scandir(day_folder) as entries:
+        files = sorted((entry for entry in entries if entry.is_file()), key=lambda entry: entry.name)
+
+    for entry in files:
+        type_id = parse_study_file_name(entry.name)
+        if type_id is None:
+            continue
+        study_type, study_id = type_id
+        if study_types is not None and study_type not in study_types:
+            continue
+        if study_ids is not None and study_id not in study_ids:
+            continue
+
+        stat = entry.stat()
+        yield StudyFile(
+            year=year,
+            month=month,
+            day=day,
+            study_type=study_type,
+            study_id=study_id,
+            path=f'{day_folder}/{entry.name}',
+            size=stat.st_size,
+            mtime=stat.st_mtime
+        )
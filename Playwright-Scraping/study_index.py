@@ -0,0 +1,126 @@
+import json
+import os
+from dataclasses import asdict
+from typing import Iterable
+from study_files import MIOVISION_BASE_FOLDER, StudyFile, scan_numbered_folders, scan_day_folder
+
+class StudyIndex:
+    """
+    On-disk index of the downloaded studies, mapping each study id to its ``StudyFile`` (type, date, path, size and
+    modification time). Looking up a study by id, or every study of a month, never touches the filesystem.
+
+    ``refresh`` only lists the day folders whose modification time changed since the last refresh, since adding,
+    removing or renaming a study changes the modification time of its folder. Pass ``full=True`` to re-stat every
+    study, e.g. after files were overwritten in place.
+
+    Without an ``index_file``, the index only lives in memory.
+    """
+    def __init__(self,index_file:str=None,base_folder:str=MIOVISION_BASE_FOLDER) -> None:
+        self.index_file = index_file
+        self.base_folder = base_folder
+        self.studies : dict[str,StudyFile] = {}
+        self.folder_mtimes : dict[str,int] = {}
+        self.by_month : dict[tuple[int,int],dict[str,StudyFile]] = {}
+
+        if index_file and os.path.exists(index_file):
+            with open(index_file) as file:
+                saved = json.load(file)
+            if saved.get('base_folder') == base_folder:
+                self.folder_mtimes = saved['folders']
+                for study_id, study in saved['studies'].items():
+                    self.add(StudyFile(**study))
+
+    def add(self,study:StudyFile)->None:
+        previous = self.studies.get(study.study_id)
+        if previous is not None:
+            self.by_month[(previous.year,previous.month)].pop(study.study_id,None)
+        self.studies[study.study_id] = study
+        self.by_month.setdefault((study.year,study.month),{})[study.study_id] = study
+
+    def remove(self,study_id:str)->None:
+        study = self.studies.pop(study_id,None)
+        if study is not None:
+            self.by_month[(study.year,study.month)].pop(study_id,None)
+
+    def refresh(self,full:bool=False)->tuple[list[str],list[str]]:
+        """
+        Bring the index up to date with the ``<YYYY>/<MM>/<DD>`` tree under the base folder
+
+        ### Parameters
+        1. full : ``bool``
+            - List every day folder, not only those whose modification time changed
+
+        ### Returns
+        ``(<Ids added or changed>, <Ids removed>)``
+        """
+        changed, removed = [], []
+        folder_studies : dict[str,set[str]] = {}
+        for study in self.studies.values():
+            folder_studies.setdefault(os.path.dirname(study.path),set()).add(study.study_id)
+
+        folder_mtimes = {}
+        for year, _, year_folder in scan_numbered_folders(self.base_folder):
+            for month, _, month_folder in scan_numbered_folders(year_folder):
+                for day, _, day_folder in scan_numbered_folders(month_folder):
+                    mtime = os.stat(day_folder).st_mtime_ns
+                    folder_mtimes[day_folder] = mtime
+                    if not full and self.folder_mtimes.get(day_folder) == mtime:
+                        continue
+
+                    found_ids = set()
+                    for study in scan_day_folder(day_folder,year,month,day):
+                        found_ids.add(study.study_id)
+                        if self.studies.get(study.study_id) != study:
+                            self.add(study)
+                            changed.append(study.study_id)
+                    # Studies that were indexed in the folder but are not in it anymore were deleted (or moved, then re-added above)
+                    for study_id in folder_studies.get(day_folder,set()) - found_ids:
+                        if os.path.dirname(self.studies[study_id].path) == day_folder:
+                            self.remove(study_id)
+                            removed.append(study_id)
+
+        # Day folders that were deleted altogether
+        for day_folder in folder_studies.keys() - folder_mtimes.keys():
+            for study_id in folder_studies[day_folder]:
+                if study_id in self.studies and os.path.dirname(self.studies[study_id].path) == day_folder:
+                    self.remove(study_id)
+                    removed.append(study_id)
+
+        self.folder_mtimes = folder_mtimes
+        return changed, removed
+
+    def save(self)->None:
+        if self.index_file:
+            with open(self.index_file,mode='w') as file:
+                json.dump({
+                    'base_folder': self.base_folder,
+                    'folders': self.folder_mtimes,
+                    'studies': {study_id: asdict(study) for study_id, study in self.studies.items()}
+                },file)
+
+    def get(self,study_id)->StudyFile:
+        """
+        Return the study with the id, or ``None`` if it was not downloaded
+        """
+        # Id columns with blanks are read as floats by pandas
+        if isinstance(study_id,float) and study_id.is_integer():
+            study_id = int(study_id)
+        return self.studies.get(str(study_id))
+
+    def paths_for_ids(self,study_ids:Iterable)->list[str]:
+        """
+        Paths of the studies with the given ids, ids that are not in the index are skipped
+        """
+        return [study.path for study in (self.get(study_id) for study_id in study_ids) if study is not None]
+
+    def studies_in_month(self,year:int,month:int)->list[StudyFile]:
+        return sorted(self.by_month.get((year,month),{}).values(),key=lambda study: study.path)
+
+    def studies_of_type(self,study_type:str)->list[StudyFile]:
+        return [study for study in self.studies.values() if study.study_type == study_type]
+
+    def paths(self)->list[str]:
+        """
+        Paths of every study, ordered by path
+        """
+        return sorted(study.path for study in self.studies.values())
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from xlsx_stream import BreakdownRows
+
+SUMMARY_SHEET_NAME = "Summary"
+BREAKDOWN_SHEET_NAME = "Total Volume Class Breakdown"
+
+DIRECTIONS = ('Southbound', 'Westbound', 'Northbound', 'Eastbound')
+MOVEMENTS = ('Right', 'Thru', 'Left', 'U-Turn')
+DIRECTION_ROW = 0
+MOVEMENT_ROW = 1
+
+
+def road_type(legs:list[str]) -> str:
+    """
+    Classifies a study as midblock (two legs) or intersection
+    """
+    return "Midblock" if len(legs) == 2 else "Intersection"
+
+
+class StudySummary:
+    """
+    Compact representation of the "Summary" sheet of a Miovision report.
+
+    The sheet is a two column label/value table, where the header row holds the study name.
+    """
+    __slots__ = ('name_label', 'name', 'fields')
+
+    def __init__(self, name_label:str, name:str, fields:dict) -> None:
+        self.name_label = name_label
+        self.name = name
+        self.fields = fields
+
+    @classmethod
+    def from_frame(cls, summary:pd.DataFrame) -> 'StudySummary':
+        """
+        Build the summary from the "Summary" sheet read with the default header row
+        """
+        summary_col_1 = summary.columns[0] # Contains the labels for the details of the study
+        summary_col_2 = summary.columns[1] # Contains the associated information for the labels
+        fields = {}
+
+        # Keep the first occurence of each label, same as a boolean mask lookup would
+        for label, value in zip(summary[summary_col_1].tolist(), summary[summary_col_2].tolist()):
+            if label not in fields:
+                fields[label] = value
+
+        return cls(name_label=summary_col_1, name=summary_col_2, fields=fields)
+
+    @classmethod
+    def from_rows(cls, rows:list[list]) -> 'StudySummary':
+        """
+        Build the summary from the raw rows of the "Summary" sheet, the first row being the header
+        """
+        fields = {}
+        for row in rows[1:]:
+            label = row[0] if row else None
+            if label not in fields:
+                fields[label] = row[1] if len(row) > 1 else None
+
+        return cls(name_label=rows[0][0], name=rows[0][1], fields=fields)
+
+    def duration_seconds(self) -> float:
+        """
+        Return the length of the study in seconds
+        """
+        return (self.fields['End Time'] - self.fields['Start Time']).total_seconds()
+
+    def lat_long(self) -> tuple[float, float]:
+        lat_long = self.fields['Latitude and Longitude'].split(',')
+        return float(lat_long[0]), float(lat_long[1])
+
+
+class HeaderLayout:
+    """
+    Role of each column of the breakdown sheet, which only depends on the direction and movement rows
+    """
+    __slots__ = ('legs', 'app_total_columns', 'movement_columns')
+
+    def __init__(self, legs:list[str], app_total_columns:list[int], movement_columns:dict[str, list[int]]) -> None:
+        self.legs = legs
+        self.app_total_columns = app_total_columns
+        self.movement_columns = movement_columns
+
+    @classmethod
+    def from_rows(cls, direction_row:list, movement_row:list) -> 'HeaderLayout':
+        legs = []
+        app_total_columns = []
+        movement_columns : dict[str, list[int]] = {}
+
+        # Only read columns while one of the four directions that we care about is the current leg,
+        # turn it off when a different leg (e.g. Northeastbound) starts
+        valid_direction_flag = False
+        last_direction = ''
+
+        for col, (direction, movement) in enumerate(zip(direction_row, movement_row)):
+            if direction in DIRECTIONS:
+                legs.append(direction)
+                last_direction = direction
+                valid_direction_flag = True
+            elif isinstance(direction, str) and 'bound' in direction:
+                valid_direction_flag = False
+
+            if not valid_direction_flag:
+                continue
+
+            if movement == 'App Total':
+                app_total_columns.append(col)
+            # Edge case for some files where instead of the 'Thru' Column, it has it under 'Direction'
+            elif movement == 'Direction':
+                movement_columns[f'{last_direction[0]} Thru'] = [col]
+            elif movement in MOVEMENTS:
+                # This way, even if there are multiple movements detected, we add them up
+                movement_columns.setdefault(f'{last_direction[0]} {movement}', []).append(col)
+
+        return cls(legs=legs, app_total_columns=app_total_columns, movement_columns=movement_columns)
+
+    def to_dict(self) -> dict:
+        return {'legs': self.legs, 'app_total_columns': self.app_total_columns, 'movement_columns': self.movement_columns}
+
+
+class LayoutCache:
+    """
+    Memoizes the ``HeaderLayout`` of every distinct breakdown header, keyed by the raw direction and movement rows.
+    Reports of the same study type share their header rows, so the column roles are only worked out once per layout.
+    When ``cache_file`` is given, the layouts are also loaded from and saved to that JSON file, keyed there by a
+    digest of the rows.
+    """
+    def __init__(self, cache_file:str=None) -> None:
+        self.cache_file = cache_file
+        self.layouts : dict[tuple[tuple, tuple], HeaderLayout] = {}
+        # Layouts by digest, only kept when they are saved
+        self.saved_layouts : dict[str, HeaderLayout] = {}
+
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file) as file:
+                self.saved_layouts = {key: HeaderLayout(**layout) for key, layout in json.load(file).items()}
+
+    @staticmethod
+    def layout_digest(direction_row:list, movement_row:list) -> str:
+        # Empty cells are NaN when read by pandas and None when streamed, both hash the same
+        cells = [None if pd.isna(cell) else str(cell) for cell in direction_row + movement_row]
+        return hashlib.sha1(json.dumps([len(direction_row), cells]).encode()).hexdigest()
+
+    def get_layout(self, direction_row:list, movement_row:list) -> HeaderLayout:
+        key = (tuple(direction_row), tuple(movement_row))
+        layout = self.layouts.get(key)
+
+        if layout is None:
+            # The digest is only worked out for headers not seen yet in this run
+            digest = self.layout_digest(direction_row, movement_row) if self.cache_file else None
+            layout = self.saved_layouts.get(digest)
+            if layout is None:
+                layout = HeaderLayout.from_rows(direction_row, movement_row)
+                if digest is not None:
+                    self.saved_layouts[digest] = layout
+            self.layouts[key] = layout
+        return layout
+
+    def save(self) -> None:
+        if self.cache_file:
+            with open(self.cache_file, mode='w') as file:
+                json.dump({key: layout.to_dict() for key, layout in self.saved_layouts.items()}, file)
+
+
+# Shared by every report parsed in this run
+LAYOUT_CACHE = LayoutCache()
+
+
+class StudyReport:
+    """
+    Compact representation of a Miovision report built once per workbook.
+
+    Holds everything the ``ParseInfo`` extractors need from the "Total Volume Class Breakdown" sheet so that
+    the sheet is only scanned a single time:
+
+    - ``legs`` : the direction names in the direction row, in column order
+    - ``app_total_columns`` : column index of the App Total for each of the legs we read
+    - ``movement_columns`` : ``'<D> <Movement>'`` mapped to the column indexes that are added up for it
+    - ``grand_total`` : the Grand Total row as a float array (NaN for empty cells)
+    - ``class_labels`` / ``class_totals`` : vehicle class labels and their rows as a 2D float array
+
+    The first three come from a ``HeaderLayout`` shared by every report with the same header, so treat them as read-only.
+    """
+    __slots__ = ('summary', 'header', 'legs', 'app_total_columns', 'movement_columns',
+                 'grand_total', 'class_labels', 'class_totals')
+
+    def __init__(self, summary:StudySummary, header:list, legs:list[str], app_total_columns:list[int],
+                 movement_columns:dict[str, list[int]], grand_total:np.ndarray, class_labels:list[str],
+                 class_totals:np.ndarray) -> None:
+        self.summary = summary
+        self.header = header
+        self.legs = legs
+        self.app_total_columns = app_total_columns
+        self.movement_columns = movement_columns
+        self.grand_total = grand_total
+        self.class_labels = class_labels
+        self.class_totals = class_totals
+
+    @classmethod
+    def from_frame(cls, summary:StudySummary, total:pd.DataFrame, layout_cache:LayoutCache=None) -> 'StudyReport':
+        """
+        Build the report from the "Total Volume Class Breakdown" sheet read with the default header row
+        """
+        legs = total[total.columns[0]].tolist()
+        grand_total_index = legs.index('Grand Total')
+        class_start_index = legs.index('% Total') + 1
+
+        return cls.from_rows(summary, BreakdownRows(
+            header=total.columns.tolist(),
+            direction_row=total.iloc[DIRECTION_ROW].tolist(),
+            movement_row=total.iloc[MOVEMENT_ROW].tolist(),
+            grand_total_row=total.iloc[grand_total_index].tolist(),
+            class_rows=total.iloc[class_start_index:].values.tolist()
+        ), layout_cache)
+
+    @classmethod
+    def from_rows(cls, summary:StudySummary, rows:BreakdownRows, layout_cache:LayoutCache=None) -> 'StudyReport':
+        """
+        Build the report from the raw rows of the breakdown sheet. ``rows.class_rows`` holds every row after '% Total',
+        where only even rows have values and odd rows have percentages. Column roles come from ``layout_cache``
+        (the run-wide cache by default).
+        """
+        # Header interpretation is skipped when the layout has been seen before
+        layout = (layout_cache or LAYOUT_CACHE).get_layout(rows.direction_row, rows.movement_row)
+
+        class_labels = [row[0] for row in rows.class_rows[::2]]
+        if class_labels:
+            # The label column is coerced to NaN as well, which keeps the column indexes aligned with the sheet
+            class_totals = pd.DataFrame(rows.class_rows[::2]).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        else:
+            class_totals = np.empty((0, len(rows.grand_total_row)))
+
+        return cls(
+            summary=summary,
+            header=rows.header,
+            legs=layout.legs,
+            app_total_columns=layout.app_total_columns,
+            movement_columns=layout.movement_columns,
+            grand_total=pd.to_numeric(pd.Series(rows.grand_total_row), errors='coerce').to_numpy(dtype=float),
+            class_labels=class_labels,
+            class_totals=class_totals
+        )
+
+    def int_total(self) -> int:
+        """
+        Return the intersection total, assume that it is in the last column
+        """
+        return int(self.grand_total[-1])
+
+    def movement_totals(self, col_values:np.ndarray=None) -> dict[str, float]:
+        """
+        Return the total for each movement, taken from ``col_values`` (the grand total row by default)
+        """
+        if col_values is None:
+            col_values = self.grand_total
+        return {move: col_values[cols].sum() for move, cols in self.movement_columns.items()}
+
+    def class_breakdown(self, col:int=-1) -> dict[str, float]:
+        """
+        Return the vehicle class breakdown for the given column, skipping the classes without data
+        (e.g. Pedestrians and Bicycles on Crosswalk for vehicle movements)
+        """
+        values = self.class_totals[:, col]
+        return {label: values[i] for i, label in enumerate(self.class_labels) if not np.isnan(values[i])}
+
+    def adjusted_totals(self, omission_classes:set[str], cols:list[int]=None) -> np.ndarray:
+        """
+        Return the grand total row excluding the volumes of the omitted classes, only the ``cols`` columns when given
+        """
+        omitted = [i for i, label in enumerate(self.class_labels) if label in omission_classes]
+        if cols is None:
+            return self.grand_total - np.nansum(self.class_totals[omitted], axis=0)
+        return self.grand_total[cols] - np.nansum(self.class_totals[omitted][:, cols], axis=0)
@@ -0,0 +1,217 @@
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+from study_report import SUMMARY_SHEET_NAME, BREAKDOWN_SHEET_NAME
+
+# Leg of the intersection mapped to the direction of the traffic approaching from it
+LEG_DIRECTIONS = {
+    'North' : 'Southbound',
+    'East' : 'Westbound',
+    'South' : 'Northbound',
+    'West' : 'Eastbound'
+}
+INTERSECTION_MOVEMENTS = ('Right', 'Thru', 'Left', 'U-Turn')
+MIDBLOCK_MOVEMENTS = ('Thru',)
+PEDESTRIAN_MOVEMENTS = ('Peds CW', 'Peds CCW')
+VEHICLE_CLASSES = ('Lights', 'Single-Unit Trucks', 'Articulated Trucks', 'Buses', 'Bicycles on Road')
+PEDESTRIAN_CLASSES = ('Pedestrians', 'Bicycles on Crosswalk')
+
+
+@dataclass
+class SyntheticStudyConfig:
+    """
+    Layout and volumes of a generated Miovision report
+    """
+    study_id : int
+    study_type : str = 'TMC'
+    legs : tuple[str, ...] = ('North', 'East', 'South', 'West')
+    movements : tuple[str, ...] = INTERSECTION_MOVEMENTS
+    direction_quirk_legs : tuple[str, ...] = () # Legs that label the 'Thru' column as 'Direction'
+    zero_app_total_legs : tuple[str, ...] = () # Legs whose App Total is 0 while their movements are not
+    vehicle_classes : tuple[str, ...] = VEHICLE_CLASSES
+    pedestrian_classes : tuple[str, ...] = PEDESTRIAN_CLASSES
+    include_pedestrians : bool = True
+    duration_hours : float = 24
+    interval_minutes : int = 15
+    start_time : datetime = datetime(2022, 5, 3)
+    max_interval_volume : int = 20
+    seed : int = 0
+    columns : list[tuple[str, str]] = field(init=False, default_factory=list)
+
+    def __post_init__(self):
+        unknown_legs = set(self.legs) - set(LEG_DIRECTIONS)
+        if unknown_legs:
+            raise ValueError(f"legs must be a subset of {list(LEG_DIRECTIONS.keys())}")
+
+        # (leg, movement) for every data column of the breakdown sheet
+        for leg in self.legs:
+            for movement in self.movements:
+                if movement == 'Thru' and leg in self.direction_quirk_legs:
+                    movement = 'Direction'
+                self.columns.append((leg, movement))
+            if self.include_pedestrians:
+                self.columns.extend((leg, movement) for movement in PEDESTRIAN_MOVEMENTS)
+            self.columns.append((leg, 'App Total'))
+
+
+def split_volume(volume:int, parts:int, rng:random.Random) -> list[int]:
+    """
+    Randomly split the volume into the given number of parts
+    """
+    cuts = sorted(rng.randint(0, volume) for _ in range(parts - 1))
+    return [upper - lower for lower, upper in zip([0] + cuts, cuts + [volume])]
+
+
+def write_study_workbook(file_path:str, config:SyntheticStudyConfig) -> None:
+    """
+    Write a workbook with the same "Summary" and "Total Volume Class Breakdown" layout as a Miovision report
+
+    ### Parameters
+    1. file_path : ``str``
+        - Where the workbook is saved, folders are created when missing
+    2. config : ``SyntheticStudyConfig``
+        - Layout and volumes of the study
+    """
+    rng = random.Random(config.seed)
+    workbook = Workbook(write_only=True)
+    end_time = config.start_time + timedelta(hours=config.duration_hours)
+
+    summary = workbook.create_sheet(SUMMARY_SHEET_NAME)
+    summary.append(['Study Name', f'Synthetic Study {config.study_id}'])
+    summary.append(['Project', 'Synthetic Project'])
+    summary.append(['Location', f'{config.study_id} Avenue & {len(config.legs)} Street'])
+    summary.append(['Latitude and Longitude', f'{rng.uniform(53.4, 53.7):.6f},{rng.uniform(-113.7, -113.3):.6f}'])
+    summary.append(['Start Time', config.start_time])
+    summary.append(['End Time', end_time])
+    summary.append(['Study Type', config.study_type])
+
+    breakdown = workbook.create_sheet(BREAKDOWN_SHEET_NAME)
+    header_row = ['Leg']
+    direction_row = ['Direction']
+    movement_row = ['Start Time']
+    for i, (leg, movement) in enumerate(config.columns):
+        first_column = i == 0 or config.columns[i - 1][0] != leg
+        header_row.append(leg if first_column else None)
+        direction_row.append(LEG_DIRECTIONS[leg] if first_column else None)
+        movement_row.append(movement)
+    header_row.append(None)
+    direction_row.append(None)
+    movement_row.append('Int. Total')
+
+    breakdown.append(header_row)
+    breakdown.append(direction_row)
+    breakdown.append(movement_row)
+
+    grand_total = [0] * (len(config.columns) + 1)
+    interval_count = int(config.duration_hours * 60 // config.interval_minutes)
+    for interval in range(interval_count):
+        values = []
+        app_total = 0
+        int_total = 0
+        for leg, movement in config.columns:
+            if movement == 'App Total':
+                value = 0 if leg in config.zero_app_total_legs else app_total
+                int_total += app_total
+                app_total = 0
+            elif movement in PEDESTRIAN_MOVEMENTS:
+                value = rng.randint(0, config.max_interval_volume // 4)
+            else:
+                value = rng.randint(0, config.max_interval_volume)
+                app_total += value
+            values.append(value)
+        values.append(int_total)
+
+        for i, value in enumerate(values):
+            grand_total[i] += value
+        breakdown.append([config.start_time + timedelta(minutes=interval * config.interval_minutes)] + values)
+
+    breakdown.append(['Grand Total'] + grand_total)
+    breakdown.append(['% Approach'] + [None] * len(grand_total))
+    breakdown.append(['% Total'] + [round(value / max(grand_total[-1], 1), 3) for value in grand_total])
+
+    # Vehicle classes split the movement columns, pedestrian classes split the pedestrian columns. App Total and
+    # Int. Total are the sums of the columns they cover, the same as in a real report, except for the App Totals of
+    # ``zero_app_total_legs``
+    class_values = {label: [None] * len(grand_total) for label in config.vehicle_classes + config.pedestrian_classes}
+    app_total_classes = {label: 0 for label in config.vehicle_classes}
+    int_total_classes = {label: 0 for label in config.vehicle_classes}
+    for i, (leg, movement) in enumerate(config.columns):
+        if movement == 'App Total':
+            for label in config.vehicle_classes:
+                class_values[label][i] = 0 if leg in config.zero_app_total_legs else app_total_classes[label]
+                int_total_classes[label] += app_total_classes[label]
+                app_total_classes[label] = 0
+            continue
+
+        labels = config.pedestrian_classes if movement in PEDESTRIAN_MOVEMENTS else config.vehicle_classes
+        for label, part in zip(labels, split_volume(grand_total[i], len(labels), rng)):
+            class_values[label][i] = part
+            if label in app_total_classes:
+                app_total_classes[label] += part
+    for label in config.vehicle_classes:
+        class_values[label][-1] = int_total_classes[label]
+
+    for label, values in class_values.items():
+        breakdown.append([label] + values)
+        breakdown.append([f'% {label}'] + [None if value is None else round(value / max(total, 1), 3)
+                                          for value, total in zip(values, grand_total)])
+
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    workbook.save(file_path)
+
+
+def random_study_config(study_id:int, rng:random.Random, start_year:int, end_year:int, interval_minutes:int=15) -> SyntheticStudyConfig:
+    """
+    Return a study config drawn from a mix of 4-leg and 3-leg intersections, 2-leg midblocks (which use
+    'Direction' instead of 'Thru'), studies that are not 24 h long and studies with a leg whose App Total is 0
+    """
+    start_time = datetime(rng.randint(start_year, end_year), rng.randint(1, 12), rng.randint(1, 28))
+    duration_hours = 24 if rng.random() < 0.9 else rng.choice([2, 6, 12, 48])
+    layout = rng.random()
+
+    if layout < 0.6:
+        legs, movements, quirk, study_type = ('North', 'East', 'South', 'West'), INTERSECTION_MOVEMENTS, (), 'TMC'
+    elif layout < 0.75:
+        legs, movements, quirk, study_type = rng.choice([('North', 'East', 'South'), ('East', 'South', 'West')]), INTERSECTION_MOVEMENTS, (), 'TMC'
+    else:
+        legs = rng.choice([('North', 'South'), ('East', 'West')])
+        legs, movements, quirk, study_type = legs, MIDBLOCK_MOVEMENTS, legs, 'ATR'
+    zero_app_total_legs = (rng.choice(legs),) if rng.random() < 0.1 else ()
+
+    return SyntheticStudyConfig(
+        study_id=study_id,
+        study_type=study_type,
+        legs=legs,
+        movements=movements,
+        direction_quirk_legs=quirk,
+        zero_app_total_legs=zero_app_total_legs,
+        include_pedestrians=study_type == 'TMC',
+        duration_hours=duration_hours,
+        interval_minutes=interval_minutes,
+        start_time=start_time,
+        seed=rng.randint(0, 2**31)
+    )
+
+
+def generate_corpus(root:str, file_count:int, seed:int=0, start_year:int=2018, end_year:int=2024, interval_minutes:int=15) -> list[str]:
+    """
+    Generate ``file_count`` workbooks under ``<root>/Miovision/<YYYY>/<MM>/<DD>/<Study Type>-<ID>.xlsx``. Workbooks that
+    already exist are reused, so growing a corpus only writes the new files.
+
+    ### Returns
+    The file paths relative to ``root`` in the './Miovision/...' form expected by ``ParseInfo.parse_file``
+    """
+    rng = random.Random(seed)
+    file_names = []
+
+    for i in range(file_count):
+        config = random_study_config(study_id=100000 + i, rng=rng, start_year=start_year, end_year=end_year, interval_minutes=interval_minutes)
+        file_name = f'./Miovision/{config.start_time:%Y/%m/%d}/{config.study_type}-{config.study_id}.xlsx'
+        full_path = os.path.join(root, file_name)
+        if not os.path.exists(full_path):
+            write_study_workbook(full_path, config)
+        file_names.append(file_name)
+
+    return file_names
@@ -0,0 +1,282 @@
+import posixpath
+import zipfile
+from typing import Iterator, NamedTuple
+from xml.etree.ElementTree import Element, iterparse, fromstring
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.cell import column_index_from_string, coordinate_from_string
+from openpyxl.utils.datetime import from_excel, CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+ROW_TAG = f'{MAIN_NS}row'
+CELL_TAG = f'{MAIN_NS}c'
+VALUE_TAG = f'{MAIN_NS}v'
+TEXT_TAG = f'{MAIN_NS}t'
+SHARED_STRING_TAG = f'{MAIN_NS}si'
+SHEET_DATA_TAG = f'{MAIN_NS}sheetData'
+
+SHARED_STRINGS_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+STYLES_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+
+
+class BreakdownRows(NamedTuple):
+    """
+    The only rows of the "Total Volume Class Breakdown" sheet that the parser needs
+    """
+    header : list
+    direction_row : list
+    movement_row : list
+    grand_total_row : list
+    class_rows : list[list]
+
+
+class XlsxStreamReader:
+    """
+    Reads rows straight from the sheet XML inside of an xlsx workbook, without building a DataFrame or
+    loading the whole workbook. Values are converted the same way ``pd.read_excel`` would: empty cells are ``None``,
+    whole numbers are ``int`` and date formatted numbers are ``datetime``.
+    """
+    def __init__(self, file:str) -> None:
+        self.archive = zipfile.ZipFile(file)
+        self.workbook_rels = self.read_rels('xl/workbook.xml')
+        self.sheet_paths, self.epoch = self.read_workbook()
+        self._shared_strings : list[str] = None
+        self._date_styles : list[bool] = None
+
+    def __enter__(self) -> 'XlsxStreamReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.archive.close()
+
+    def read_rels(self, part:str) -> dict[str, tuple[str, str]]:
+        """
+        Return the relationships of the part as ``{Id : (Type, path inside the archive)}``
+        """
+        folder, name = posixpath.split(part)
+        rels = fromstring(self.archive.read(f'{folder}/_rels/{name}.rels'))
+        relationships = {}
+
+        for rel in rels.iter(f'{PACKAGE_REL_NS}Relationship'):
+            target = rel.get('Target')
+            # Targets are either absolute in the package, or relative to the folder of the part
+            path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'{folder}/{target}')
+            relationships[rel.get('Id')] = (rel.get('Type'), path)
+
+        return relationships
+
+    def read_workbook(self) -> tuple[dict[str, str], object]:
+        """
+        Return the archive path of each sheet by name, along with the date epoch of the workbook
+        """
+        workbook = fromstring(self.archive.read('xl/workbook.xml'))
+        sheet_paths = {sheet.get('name'): self.workbook_rels[sheet.get(f'{REL_NS}id')][1]
+                       for sheet in workbook.iter(f'{MAIN_NS}sheet')}
+
+        properties = workbook.find(f'{MAIN_NS}workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        return sheet_paths, CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+    def find_part(self, rel_type:str) -> str:
+        for part_type, path in self.workbook_rels.values():
+            if part_type == rel_type:
+                return path
+        return None
+
+    @property
+    def shared_strings(self) -> list[str]:
+        if self._shared_strings is None:
+            self._shared_strings = []
+            path = self.find_part(SHARED_STRINGS_REL_TYPE)
+
+            if path is not None:
+                with self.archive.open(path) as strings:
+                    for _, elem in iterparse(strings, events=('end',)):
+                        if elem.tag == SHARED_STRING_TAG:
+                            self._shared_strings.append(''.join(text.text or '' for text in elem.iter(TEXT_TAG)))
+                            elem.clear()
+
+        return self._shared_strings
+
+    @property
+    def date_styles(self) -> list[bool]:
+        """
+        For each cell style index, whether the number format of that style is a date
+        """
+        if self._date_styles is None:
+            self._date_styles = []
+            path = self.find_part(STYLES_REL_TYPE)
+
+            if path is not None:
+                styles = fromstring(self.archive.read(path))
+                formats = dict(BUILTIN_FORMATS)
+                for num_fmt in styles.iter(f'{MAIN_NS}numFmt'):
+                    formats[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode')
+
+                cell_xfs = styles.find(f'{MAIN_NS}cellXfs')
+                if cell_xfs is not None:
+                    self._date_styles = [is_date_format(formats.get(int(xf.get('numFmtId', 0)), 'General'))
+                                         for xf in cell_xfs.iter(f'{MAIN_NS}xf')]
+
+        return self._date_styles
+
+    def cell_value(self, cell:Element):
+        cell_type = cell.get('t', 'n')
+
+        if cell_type == 'inlineStr':
+            value = ''.join(text.text or '' for text in cell.iter(TEXT_TAG))
+            return value if value else None
+
+        value = cell.findtext(VALUE_TAG)
+        if value is None or cell_type == 'e':
+            return None
+        if cell_type == 's':
+            value = self.shared_strings[int(value)]
+            return value if value else None
+        if cell_type == 'str':
+            return value if value else None
+        if cell_type == 'b':
+            return value == '1'
+
+        number = float(value)
+        style = cell.get('s')
+        if style is not None and int(style) < len(self.date_styles) and self.date_styles[int(style)]:
+            return from_excel(number, self.epoch)
+        return int(number) if number.is_integer() else number
+
+    def row_values(self, row:Element) -> list:
+        """
+        Return the values of the row, ``None`` for cells that are missing
+        """
+        values = []
+        for cell in row.iter(CELL_TAG):
+            reference = cell.get('r')
+            if reference is not None:
+                # Cells that are empty are not written, so pad up to the column of the cell
+                col = column_index_from_string(coordinate_from_string(reference)[0]) - 1
+                values.extend([None] * (col - len(values)))
+            values.append(self.cell_value(cell))
+
+        return values
+
+    def first_label(self, row:Element) -> str:
+        """
+        Return the text in column A of the row without converting the rest of the row, ``None`` when the cell
+        does not hold text (e.g. the start time of an interval row)
+        """
+        cell = row.find(CELL_TAG)
+        if cell is None or cell.get('t') not in ('s', 'inlineStr', 'str'):
+            return None
+        reference = cell.get('r')
+        if reference is not None and coordinate_from_string(reference)[0] != 'A':
+            return None
+        return self.cell_value(cell)
+
+    def iter_row_elements(self, sheet_name:str) -> Iterator[Element]:
+        """
+        Yield the row elements of the sheet one at a time, each one is cleared once the caller moves on
+        """
+        if sheet_name not in self.sheet_paths:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+        with self.archive.open(self.sheet_paths[sheet_name]) as sheet:
+            sheet_data = None
+            for event, elem in iterparse(sheet, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == SHEET_DATA_TAG:
+                        sheet_data = elem
+                elif elem.tag == ROW_TAG:
+                    yield elem
+                    # Drop the finished row so memory does not grow with the length of the sheet
+                    sheet_data.clear()
+                elif elem.tag == SHEET_DATA_TAG:
+                    return
+
+    def iter_rows(self, sheet_name:str) -> Iterator[list]:
+        """
+        Yield the values of every row in the sheet that is not blank
+        """
+        for row in self.iter_row_elements(sheet_name):
+            values = self.row_values(row)
+            if any(value is not None for value in values):
+                yield values
+
+    def head(self, sheet_name:str, nrows:int) -> list[list]:
+        """
+        Return the first ``nrows`` rows of the sheet that are not blank, the rest of the sheet is never parsed
+        """
+        rows = []
+        if nrows <= 0:
+            return rows
+
+        for values in self.iter_rows(sheet_name):
+            rows.append(values)
+            if len(rows) == nrows:
+                break
+        return rows
+
+    def read_breakdown_rows(self, sheet_name:str) -> BreakdownRows:
+        """
+        Collect the two header rows below the column names, the 'Grand Total' row and the rows after '% Total'.
+        Only the first cell of the interval rows is read.
+        """
+        head = []
+        grand_total_row = None
+        class_rows = None
+
+        for row in self.iter_row_elements(sheet_name):
+            if len(head) < 3:
+                values = self.row_values(row)
+                if any(value is not None for value in values):
+                    head.append(values)
+            elif class_rows is not None:
+                values = self.row_values(row)
+                if any(value is not None for value in values):
+                    class_rows.append(values)
+            else:
+                label = self.first_label(row)
+                if label == 'Grand Total' and grand_total_row is None:
+                    grand_total_row = self.row_values(row)
+                elif label == '% Total':
+                    class_rows = []
+
+        if len(head) < 3 or grand_total_row is None or class_rows is None:
+            raise ValueError(f"'Grand Total' and '% Total' rows not found in '{sheet_name}'")
+
+        # Line every row up to the same number of columns, as a DataFrame would
+        rows = head + [grand_total_row] + class_rows
+        width = max(len(row) for row in rows)
+        for row in rows:
+            row.extend([None] * (width - len(row)))
+
+        return BreakdownRows(
+            header=head[0],
+            direction_row=head[1],
+            movement_row=head[2],
+            grand_total_row=grand_total_row,
+            class_rows=class_rows
+        )
+
+
+def read_header_rows(file:str, sheet_name:str, nrows:int=3) -> list[list]:
+    """
+    Probe the first rows of a sheet (the column names being the first row) without reading the rest of the workbook
+
+    ### Parameters
+    1. file : ``str``
+        - Path to the xlsx workbook
+    2. sheet_name : ``str``
+        - Name of the sheet to probe
+    3. nrows : ``int``
+        - Number of rows that are not blank to return
+
+    ### Returns
+    The values of each row, with ``None`` for empty cells
+    """
+    with XlsxStreamReader(file) as workbook:
+        return workbook.head(sheet_name, nrows)
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import time
+import pandas as pd
+from validation_test import validate_frame
+
+DEFAULT_PAGES = [1, 2, 4, 8, 16]
+DEFAULT_STUDIES = 100
+
+
+def configure_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="Validation Benchmark",
+        description="Reports how many studies per minute validate_data checks with different numbers of browser pages, using either backend"
+    )
+    parser.add_argument('aggregate_file', help='Aggregate Excel file, the first rows are validated')
+    parser.add_argument('--auth-file', default='./auth.json', help='Storage state saved by get_credentials')
+    parser.add_argument('--pages', type=int, nargs='+', default=DEFAULT_PAGES, help='Numbers of pages to try')
+    parser.add_argument('--backend', default='browser', choices=['browser', 'http'], help='How the study pages are read')
+    parser.add_argument('--studies', type=int, default=DEFAULT_STUDIES, help='Number of studies validated in each run')
+    return parser
+
+
+def studies_per_minute(data:pd.DataFrame, auth_file:str, pages:int, backend:str) -> float:
+    start = time.perf_counter()
+    asyncio.run(validate_frame(data, auth_file, pages, backend))
+    return len(data) / (time.perf_counter() - start) * 60
+
+
+if __name__ == "__main__":
+    args = configure_parser().parse_args()
+    data = pd.read_excel(args.aggregate_file).head(args.studies)
+
+    baseline = None
+    for pages in args.pages:
+        rate = studies_per_minute(data, args.auth_file, pages, args.backend)
+        baseline = baseline or rate
+        print(f'{pages} pages: {rate:.1f} studies/min ({rate / baseline:.2f}x)')
@@ -1,57 +1,96 @@
+import numpy as np
 import pandas as pd
 
+# Same order as the discrepancies were logged in, which the Bike-Path check relies on
+OUT_COLS = ['Southbound Out','Northbound Out','Westbound Out','Eastbound Out']
+LINK = "https://datalink.miovision.com/studies/"
+
+def join_aggregate(actuals:pd.DataFrame,aggregate:pd.DataFrame)->pd.DataFrame:
+    """
+    Join the scraped actuals ('ID', 'Act. <Direction> Out', 'Link') to the Out volumes of the aggregate on the study id
+
+    ### Returns
+    The validation frame, with an 'Alg. <Direction> Out' column for each actual
+    """
+    id_col = aggregate.columns[0]
+    estimates = aggregate[[id_col] + OUT_COLS].drop_duplicates(id_col)
+    estimates.columns = ['ID'] + [f'Alg. {col}' for col in OUT_COLS]
+
+    validation = actuals.merge(estimates,on='ID',how='left',sort=False)
+    cols = ['ID'] + [f'Alg. {col}' for col in OUT_COLS] + [f'Act. {col}' for col in OUT_COLS] + ['Link']
+    return validation[cols]
+
+def discrepancy_mask(validation:pd.DataFrame)->np.ndarray:
+    """
+    For every study and Out direction, whether the actual value exists and does not equal the estimate
+
+    ### Returns
+    A boolean array of shape ``(<Studies>, 4)``, the columns in the order of ``OUT_COLS``
+    """
+    actual = validation[[f'Act. {col}' for col in OUT_COLS]].to_numpy(dtype=float)
+    estimate = validation[[f'Alg. {col}' for col in OUT_COLS]].to_numpy(dtype=float)
+    return ~np.isnan(actual) & (actual != estimate)
+
+def categorize(mask:np.ndarray)->np.ndarray:
+    """
+    Category of each study from its discrepancies, ``None`` for studies without any.
+
+    One discrepancy is a One-way. With more, ped way problems are always Southbound then Northbound, or Westbound
+    then Eastbound, so the study is a Bike-Path when its first two discrepancies are one of those pairs, and an
+    Out Calc. otherwise.
+    """
+    south, north, west, east = mask.T
+    count = mask.sum(axis=1)
+    bike_path = (south & north) | (~south & ~north & west & east)
+
+    return np.select(
+        [count == 1, (count > 1) & bike_path, count > 1],
+        ["One-way", "Bike-Path", "Out Calc."],
+        default=None
+    )
+
+def create_error_frame(validation:pd.DataFrame)->pd.DataFrame:
+    """
+    Keep the studies of the validation frame that have a discrepancy, with their category (Bike-Path, One-way, Out Calc.)
+    """
+    mask = discrepancy_mask(validation)
+    has_errors = mask.any(axis=1)
+    categories = categorize(mask)
+    ids = validation['ID'].to_numpy()[has_errors]
+
+    return pd.DataFrame({
+        "ID" : ids,
+        "Category" : categories[has_errors],
+        "Link" : [f'{LINK}{id}' for id in ids]
+    })
+
 def create_error_file(filename:str):
     """
     Input the error file and create an excel with corrsponding categories (Bike-Path, One-way, Out Calc.)
     """
-    
+
     # File is space seperated into format: 'Discrepancy within 1119796 for Northbound Out direction'
     # Grab index 2, and 4 for ID and direction
-    
-    
-    
-    errors = open(filename,'r').readlines()
-    ids = [error.split(' ')[2] for error in errors]
-    directions = [error.split(' ')[4] for error in errors]
-    excel_data = {"ID" : [],"Category" : [],"Link" : []}
-    link = "https://datalink.miovision.com/studies/"
-    error_mapping : dict[str,list] = {}
-    direction_mapping = {
-            'Southbound' : 1,
-            'Westbound' : 2,
-            'Northbound' : 3,
-            'Eastbound' : 4
-        }
-    # Store each id mapping, and the corresponding direction errors
-    for i,id in enumerate(ids):
-        if id in error_mapping:
-            error_mapping[id].append(direction_mapping[directions[i]])
-        else:
-            error_mapping[id] = [direction_mapping[directions[i]]]
-    
-    for id in list(error_mapping.keys()):
-        excel_data["ID"].append(id)
-        excel_data["Link"].append(f'{link}{id}')
-        directions = error_mapping[id]
-        if len(directions) == 1:
-            excel_data["Category"].append("One-way")
-        else:
-            # Ped way problems are always Southbound, then Northbound, which would be 1 + 2 = 3
-            # Or Westbound then Eastbound, which would be 2 + 2 = 4
-            if directions[0] + 2 == directions[1]:
-                excel_data["Category"].append("Bike-Path")
-            else:
-                excel_data["Category"].append("Out Calc.")
-    
-    
-    excel_frame = pd.DataFrame(excel_data)
+    words = pd.read_csv(filename,sep=' ',header=None,usecols=[2,4],names=['ID','Direction'],dtype=str)
+    flagged = pd.crosstab(words['ID'],words['Direction']).reindex(columns=[col.split(' ')[0] for col in OUT_COLS],fill_value=0)
+    # Keep the ids in the order they were logged
+    flagged = flagged.loc[words['ID'].unique()]
+
+    categories = categorize(flagged.to_numpy() > 0)
+    excel_frame = pd.DataFrame({
+        "ID" : flagged.index,
+        "Category" : categories,
+        "Link" : [f'{LINK}{id}' for id in flagged.index]
+    })
     excel_frame.to_excel('Errors.xlsx',index=False)
-   
-    
-    
-    
-    
+
+def create_errors_from_validation(validation_file_name:str,errors_file_name:str='Errors.xlsx'):
+    """
+    Create the errors excel from a validation excel written by ``validate_data``
+    """
+    validation = pd.read_excel(validation_file_name)
+    create_error_frame(validation).to_excel(errors_file_name,index=False)
 
 if __name__ == "__main__":
-    filename = "./errors1.txt"
-    create_error_file(filename=filename)
\ No newline at end of file
+    validation_file_name = "2014-2024_validation.xlsx"
+    create_errors_from_validation(validation_file_name)
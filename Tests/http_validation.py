@@ -0,0 +1,86 @@
+import json
+import re
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from lxml import html
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+
+EXIT_TOTAL_CLASSES = ('movement', 'exit_total')
+EXIT_NUMBER = re.compile(r'exit_\d+')
+
+def build_session(auth_file_name:str,pool_size:int)->requests.Session:
+    """
+    Create a session that reuses up to ``pool_size`` connections and sends the cookies saved by ``get_credentials``
+    """
+    with open(auth_file_name) as file:
+        storage_state = json.load(file)
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1,pool_maxsize=pool_size)
+    session.mount('https://',adapter)
+    for cookie in storage_state['cookies']:
+        session.cookies.set(cookie['name'],cookie['value'],domain=cookie['domain'],path=cookie.get('path','/'))
+    return session
+
+def parse_exit_totals(page_html:bytes,col_html_map:dict[str,str])->dict[str,float]:
+    """
+    Read the exit totals from the server rendered page, the same text the browser backend reads from
+    ``.movement.exit_total.exit_N``
+
+    ### Returns
+    The actual value of each Out column, ``np.nan`` for directions the study does not have. ``None`` when the page has
+    no exit totals at all, which means they are only rendered by JavaScript.
+    """
+    tree = html.fromstring(page_html)
+    exit_totals = {}
+    for element in tree.xpath('//*[contains(@class,"exit_total")]'):
+        classes = element.get('class').split()
+        if all(name in classes for name in EXIT_TOTAL_CLASSES):
+            for name in classes:
+                if EXIT_NUMBER.fullmatch(name) and name not in exit_totals:
+                    exit_totals[name] = element.text_content()
+
+    if not exit_totals:
+        return None
+
+    actuals = {}
+    for col, exit_name in col_html_map.items():
+        text = exit_totals.get(exit_name)
+        actuals[col] = np.nan if text is None else int(text.split(':')[1])
+    return actuals
+
+class HTTPExitTotalFetcher:
+    """
+    Fetch study pages over plain HTTP with the cached session cookie, several at a time over a pooled connection
+    """
+    def __init__(self,auth_file_name:str,study_link:str,col_html_map:dict[str,str],workers:int=16) -> None:
+        self.session = build_session(auth_file_name,workers)
+        self.study_link = study_link
+        self.col_html_map = col_html_map
+        self.workers = workers
+
+    def fetch(self,id)->dict[str,float]:
+        """
+        ### Returns
+        The actual value of each Out column, or ``None`` if the study has to be read in a browser
+        """
+        try:
+            response = self.session.get(f'{self.study_link}{id}',timeout=300)
+            response.raise_for_status()
+            return parse_exit_totals(response.content,self.col_html_map)
+        except Exception as e:
+            print(e)
+            return None
+
+    def iter_fetch(self,ids:list)->Iterator[dict[str,float]]:
+        """
+        Fetch every study ``workers`` at a time, results are yielded in the same order as ``ids``
+        """
+        with ThreadPoolExecutor(self.workers) as executor:
+            yield from tqdm(executor.map(self.fetch,ids),total=len(ids))
+
+    def close(self)->None:
+        self.session.close()
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+def to_sql_value(value):
+    """
+    Convert numpy scalars to Python values sqlite can bind, ``np.nan`` to NULL
+    """
+    if isinstance(value,np.generic):
+        value = value.item()
+    if isinstance(value,float) and np.isnan(value):
+        return None
+    return value
+
+class ValidationCheckpoint:
+    """
+    SQLite store of the validation rows, keyed by study ID. Rows are committed a batch at a time, so a validation that
+    is restarted with the same checkpoint file only fetches the studies that were not committed yet, wherever they now
+    sit in the aggregate. Only studies whose page was read are added, the others are fetched again on the next run.
+    Without a ``checkpoint_file`` the rows only live in memory.
+    """
+    def __init__(self,checkpoint_file:str,source:str,cols:list[str],batch_size:int=100,id_col:str='ID') -> None:
+        self.cols = cols
+        self.id_col = id_col
+        self.batch_size = batch_size
+        self.pending : list[tuple] = []
+        # Rows are added from the thread of the http backend as well as from the event loop, one at a time
+        self.connection = sqlite3.connect(checkpoint_file or ':memory:',check_same_thread=False)
+
+        # Columns are left untyped, so ids are read back with the type they were written with
+        quoted_cols = ', '.join(f'"{col}"' for col in cols)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS study_results ({quoted_cols}, PRIMARY KEY ("{id_col}"))')
+            self.connection.execute('INSERT OR IGNORE INTO meta VALUES (?, ?)',('source',source))
+
+        saved_source = self.connection.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()[0]
+        if saved_source != source:
+            raise ValueError(f"{checkpoint_file} is the checkpoint of '{saved_source}', not '{source}'")
+
+        placeholders = ', '.join('?' for _ in cols)
+        self.insert_statement = f'INSERT OR REPLACE INTO study_results ({quoted_cols}) VALUES ({placeholders})'
+
+    def completed_ids(self)->set:
+        """
+        Studies that were validated by a previous run, i.e. the ones not to fetch again
+        """
+        return {study_id for (study_id,) in self.connection.execute(f'SELECT "{self.id_col}" FROM study_results')}
+
+    def add(self,row:dict)->None:
+        self.pending.append(tuple(to_sql_value(row.get(col,np.nan)) for col in self.cols))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self)->None:
+        """
+        Commit the pending rows
+        """
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(self.insert_statement,self.pending)
+            self.pending = []
+
+    def results(self)->pd.DataFrame:
+        """
+        Every committed row, one per study
+        """
+        self.flush()
+        quoted_cols = ', '.join(f'"{col}"' for col in self.cols)
+        records = self.connection.execute(f'SELECT {quoted_cols} FROM study_results').fetchall()
+        frame = pd.DataFrame.from_records(records,columns=self.cols)
+        volume_cols = [col for col in self.cols if col.startswith(('Act. ','Alg. '))]
+        frame[volume_cols] = frame[volume_cols].apply(pd.to_numeric)
+        return frame
+
+    def close(self)->None:
+        self.flush()
+        self.connection.close()
+
+def default_checkpoint_file(validation_file_name:str)->str:
+    return os.path.splitext(validation_file_name)[0] + '.sqlite'
@@ -1,11 +1,15 @@
 from playwright.sync_api import sync_playwright,Playwright,Browser,BrowserContext,Page,Locator
 from playwright.async_api import async_playwright
+import os
 import pandas as pd
 import time
 import numpy as np
 import asyncio
 import json
 from tqdm import tqdm
+from validation_checkpoint import ValidationCheckpoint, default_checkpoint_file
+from error_handling import join_aggregate, create_error_frame
+from typing import Callable
 
 def reformat_dict(data_dict:dict)->dict:
     """
@@ -18,102 +22,205 @@ def reformat_dict(data_dict:dict)->dict:
     
     return new_dict
 
-async def validate_data(file_name:str,auth_file_name:str,validation_file_name):
+OUT_COLS = ['Southbound Out','Northbound Out','Westbound Out','Eastbound Out']
+COL_HTML_MAP = {
+    'Southbound Out':'exit_1',
+    'Westbound Out':'exit_3',
+    'Northbound Out':'exit_5',
+    'Eastbound Out':'exit_7'
+}
+LOCATOR_STR = '.movement.exit_total.'
+STUDY_LINK = 'https://datalink.miovision.com/studies/'
+
+async def fetch_exit_totals(page:Page,id)->dict[str,float]:
     """
-    Validate the results from the miovision aggregate data.
+    Open the study page and read the exit total of each Out direction, ``np.nan`` for directions the study does not have
     """
-    data = pd.read_excel(file_name)
-    id_col = data.columns[0]
-    out_cols = ['Southbound Out','Northbound Out','Westbound Out','Eastbound Out']
-    estimate_cols = ['Alg. ' + i for i in out_cols]
-    actual_cols = ['Act. ' + i for i in out_cols]
-    vol_cols = estimate_cols + actual_cols
-    out_data_dict = {}
-    out_data_dict["ID"] = []
-    out_data_dict['Link'] = []
-    
-    # Contains all of the headers to be used for the outputted excel file
-    cols = ["ID"] + vol_cols + ["Link"]
-    
-    # pd DataFrame to be used to output excel
-    
-    out_data = pd.DataFrame(columns=cols)
-    col_html_map = {
-        'Southbound Out':'exit_1',
-        'Westbound Out':'exit_3',
-        'Northbound Out':'exit_5',
-        'Eastbound Out':'exit_7'
-    }
-    ids = list(data.loc[:,id_col])
-    
+    await page.goto(f'{STUDY_LINK}{id}')
+    actuals = {}
+    for col in OUT_COLS:
+        try:
+            locator : Locator =  page.locator(f'{LOCATOR_STR}{COL_HTML_MAP[col]}')
+            if await locator.count() != 0:
+                text : str = await locator.text_content()
+                actuals[col] = int(text.split(':')[1])
+            else:
+                actuals[col] = np.nan
+        except Exception as e:
+            print(e)
+    return actuals
+
+def study_row(id,actuals:dict[str,float])->dict:
+    """
+    Build the validation row of a study from the actual value of each Out column, the estimates are joined later
+    """
+    row = {'ID' : id,'Link' : f'{STUDY_LINK}{id}'}
+    for col,actual in actuals.items():
+        row[f'Act. {col}'] = actual
+    return row
+
+async def fetch_with_browser(ids:list,auth_file_name:str,on_result:Callable[[int,dict],None],pages:int=1)->list:
+    """
+    Read the exit totals of every study with ``pages`` browser pages open at once in a single context.
+    ``on_result(<Position in ids>, <Actual value of each Out column>)`` is called as soon as each study is read.
+    Studies whose page could not be loaded are not reported, as they have no actuals to validate against.
+
+    ### Returns
+    The ids of the studies that could not be loaded
+    """
+    failed_ids = []
+    if not ids:
+        return failed_ids
+
     async with async_playwright() as playwright:
         browser : Browser = await playwright.chromium.launch(headless=True)
         context : BrowserContext= await browser.new_context(storage_state=auth_file_name)
         context.set_default_navigation_timeout(300000)
-        
-        page : Page = await context.new_page()
-        locator_str = '.movement.exit_total.'
-        
-        
-        
-        for i,id in enumerate(tqdm(ids)):
-            await page.goto(f'https://datalink.miovision.com/studies/{id}')
-            out_data_dict['ID'].append(id)
-            out_data_dict['Link'].append(f'https://datalink.miovision.com/studies/{id}')
-            
-            # used to track which directions were inputted, and which were not
-            # Needed in order to fill the 
-            col_index = [i for i in range(len(estimate_cols) + len(actual_cols))]
-            for col in out_cols:
-                try:
-                    locator : Locator =  page.locator(f'{locator_str}{col_html_map[col]}')
-                    if await locator.count() != 0:
-                        # if  locator is found, then record the actual values for that column
-                        text : str = await locator.text_content()
-                        actual = int(text.split(':')[1])
-                        estimate = data.loc[i,col]
-                        actual_col = f'Act. {col}'
-                        estimate_col = f'Alg. {col}'             
-                    else:
-                        # record nothing for that column
-                        actual = np.nan
-                        estimate = np.nan
-                        actual_col = f'Act. {col}'
-                        estimate_col = f'Alg. {col}'
-                    
-                    
-                    # Check to see if the col has been added before adding it
-                    if actual_col in out_data_dict:
-                        out_data_dict[actual_col].append(actual)
-                    else:
-                        out_data_dict[actual_col] = [actual]
-                    if estimate_col in out_data_dict:
-                        out_data_dict[estimate_col].append(estimate)
-                    else:
-                        out_data_dict[estimate_col] = [estimate]
-                        
-                    # Log all of the discrepancies, as long as the value exists (actual > -1, np.nan would be False)
-                    # and if the actual value does not equal the estimate
-                    if actual != estimate and actual > -1:
-                        with open('./errors1.txt','a') as file:
-                            file.write(f'Discrepancy within {id} for {col} direction\n')
-                            print(f'Discrepancy within {id} for {col} direction')
-                            file.close()
-                        
-                except Exception as e:
-                    print(e)
-
-                
-        new_frame = pd.DataFrame(out_data_dict)
-        main_frame = pd.concat([out_data,new_frame],ignore_index=True)
-        await page.close()
+
+        # Free pages wait in the queue, so at most ``pages`` studies are loading at any time
+        page_pool : asyncio.Queue[Page] = asyncio.Queue()
+        for _ in range(pages):
+            page_pool.put_nowait(await context.new_page())
+        progress = tqdm(total=len(ids))
+
+        async def fetch_study(i:int,id):
+            page = await page_pool.get()
+            try:
+                actuals = await fetch_exit_totals(page,id)
+            except Exception as e:
+                print(e)
+                failed_ids.append(id)
+                return
+            finally:
+                page_pool.put_nowait(page)
+                progress.update()
+            on_result(i,actuals)
+
+        await asyncio.gather(*(fetch_study(i,id) for i,id in enumerate(ids)))
+        progress.close()
+
+        while not page_pool.empty():
+            await page_pool.get_nowait().close()
         await context.close()
         await browser.close()
+    return failed_ids
+
+async def fetch_with_http(ids:list,auth_file_name:str,on_result:Callable[[int,dict],None],pages:int=1,workers:int=16)->list:
+    """
+    Read the exit totals from the server HTML of every study, studies whose totals are only rendered by
+    JavaScript, or whose request failed, are read in the browser afterwards
+
+    ### Returns
+    The ids of the studies that could not be loaded in the browser either
+    """
+    # requests and lxml are only needed by this backend
+    from http_validation import HTTPExitTotalFetcher
+    browser_rows = []
+
+    def fetch_all():
+        fetcher = HTTPExitTotalFetcher(auth_file_name,STUDY_LINK,COL_HTML_MAP,workers)
+        try:
+            for i,actuals in enumerate(fetcher.iter_fetch(ids)):
+                if actuals is None:
+                    browser_rows.append(i)
+                else:
+                    on_result(i,actuals)
+        finally:
+            fetcher.close()
+
+    await asyncio.to_thread(fetch_all)
+
+    if not browser_rows:
+        return []
+    print(f'{len(browser_rows)} studies need a browser')
+    return await fetch_with_browser([ids[i] for i in browser_rows],auth_file_name,
+                                    lambda j,actuals: on_result(browser_rows[j],actuals),pages)
+
+async def validate_frame(data:pd.DataFrame,auth_file_name:str,pages:int=1,backend:str='browser',workers:int=16,
+                         checkpoint_file:str=None,source:str='',batch_size:int=100)->pd.DataFrame:
+    """
+    Validate every study of the aggregate against the exit totals on its study page
+
+    ### Parameters
+    1. data : ``pd.DataFrame``
+        - Aggregate, with the study ids in the first column
+    2. auth_file_name : ``str``
+        - Storage state saved by ``get_credentials``
+    3. pages : ``int``
+        - Number of browser pages open at once
+    4. backend : ``str``
+        - 'browser' renders every study page, 'http' parses the server HTML and only uses the browser as a fallback
+    5. workers : ``int``
+        - Number of concurrent requests of the 'http' backend
+    6. checkpoint_file : ``str``
+        - SQLite file the rows are committed to by study ID every ``batch_size`` studies. Studies already in it are
+        skipped, so a crashed validation resumes where it stopped, even if the aggregate was regenerated or re-sorted
+        since. Rows only live in memory when ``None``.
+    7. source : ``str``
+        - Name of the aggregate, a checkpoint file of a different aggregate is refused
+
+    ### Returns
+    The validation rows, in the same order as the aggregate, without the studies whose page could not be loaded
+    """
+    id_col = data.columns[0]
+    actual_cols = ['Act. ' + i for i in OUT_COLS]
+    ids = list(dict.fromkeys(data.loc[:,id_col]))
+
+    checkpoint = ValidationCheckpoint(checkpoint_file,source,["ID"] + actual_cols + ["Link"],batch_size)
+    try:
+        completed = checkpoint.completed_ids()
+        remaining_ids = [id for id in ids if id not in completed]
+        if completed:
+            print(f'Resuming with {len(remaining_ids)} of {len(ids)} studies left')
+
+        def on_result(j:int,actuals:dict):
+            checkpoint.add(study_row(remaining_ids[j],actuals))
+
+        if backend == 'http':
+            failed_ids = await fetch_with_http(remaining_ids,auth_file_name,on_result,pages,workers)
+        elif backend == 'browser':
+            failed_ids = await fetch_with_browser(remaining_ids,auth_file_name,on_result,pages)
+        else:
+            raise ValueError(f"backend must be 'browser' or 'http', not '{backend}'")
         
-        main_frame.to_excel(validation_file_name,index=False)
+        # Failed studies are left out of the validation rather than passing it with no actuals
+        if failed_ids:
+            print(f'{len(failed_ids)} studies could not be loaded and are left out, rerun to retry them: {failed_ids}')
+
+        # Studies of the checkpoint that are no longer in the aggregate are dropped
+        actuals = pd.DataFrame({'ID': ids}).merge(checkpoint.results(),on='ID',how='inner',sort=False)
+    finally:
+        checkpoint.close()
+
+    # Estimates only exist where the study page has the direction, as the columns are compared side by side
+    validation = join_aggregate(actuals,data)
+    estimate_cols = ['Alg. ' + i for i in OUT_COLS]
+    validation[estimate_cols] = validation[estimate_cols].where(validation[actual_cols].notna().to_numpy())
+    return validation
+
+async def validate_data(file_name:str,auth_file_name:str,validation_file_name,pages:int=1,backend:str='browser',checkpoint_file:str=None,errors_file_name:str='Errors.xlsx',workers:int=16):
+    """
+    Validate the results from the miovision aggregate data, and write the studies with discrepancies along with their
+    category to ``errors_file_name``. ``workers`` is the number of concurrent requests of the 'http' backend. Progress is checkpointed next to the validation file unless ``checkpoint_file``
+    says otherwise, rerunning after a crash continues where it stopped. The checkpoint is deleted once every study
+    is validated and both files are written, so the next validation fetches every study again.
+    """
+    data = pd.read_excel(file_name)
+    checkpoint_file = default_checkpoint_file(validation_file_name) if checkpoint_file is None else checkpoint_file
+    main_frame = await validate_frame(data,auth_file_name,pages,backend,workers,checkpoint_file=checkpoint_file,source=file_name)
+    main_frame.to_excel(validation_file_name,index=False)
+
+    errors = create_error_frame(main_frame)
+    print(f'{len(errors)} studies with discrepancies')
+    errors.to_excel(errors_file_name,index=False)
     
+    # Studies that could not be loaded are only retried while their checkpoint is kept
+    missing_ids = set(data.iloc[:,0]) - set(main_frame['ID'])
+    if missing_ids:
+        print(f'Keeping {checkpoint_file} to retry {len(missing_ids)} studies')
+    elif checkpoint_file and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
     
-
 def get_credentials(auth_file:str):
     link = 'https://datalink.miovision.com/'
     playwright : Playwright = sync_playwright().start()
@@ -130,6 +237,8 @@ if __name__ == '__main__':
     auth_file = './auth.json'
     excel_file = './Miovision Aggregate Data Updated 2014-2024.xlsx'
     validation_file_name = "2014-2024_validation.xlsx"
+    pages = 8
+    backend = 'browser' # 'http' reads the server HTML and only falls back to the browser, see fetch_with_http
     # get_credentials(auth_file)
-    asyncio.run(validate_data(excel_file,auth_file,validation_file_name))
+    asyncio.run(validate_data(excel_file,auth_file,validation_file_name,pages,backend))
     
\ No newline at end of file